@@ -0,0 +1,5 @@
+"""
+Endpoint micro-benchmarks for VIN GUI application
+
+Run with: python -m benchmarks --images 50,200 --vins 100,1000 --output results.json
+"""
@@ -0,0 +1,52 @@
+"""
+Command-line entry point: python -m benchmarks
+"""
+import sys
+import json
+import argparse
+import tempfile
+
+from benchmarks.runner import run_case, environment_info, compare
+
+
+def parse_counts(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VIN GUI endpoint benchmarks")
+    parser.add_argument("--images", type=parse_counts, default=[50, 200], help="Comma-separated raw image counts (default: 50,200)")
+    parser.add_argument("--vins", type=parse_counts, default=[100, 1000], help="Comma-separated VIN counts (default: 100,1000)")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per endpoint (default: 20)")
+    parser.add_argument("--work-dir", help="Directory for the synthetic corpus (default: a temp directory)")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="Baseline JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed latency growth over the baseline (default: 0.10)")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="vin_bench_")
+    results = {"environment": environment_info(), "results": []}
+    for image_count in args.images:
+        for vin_count in args.vins:
+            print(f"Benchmarking {image_count} images, {vin_count} VINs...", file=sys.stderr)
+            results["results"].append(run_case(work_dir, image_count, vin_count, repeat=args.repeat))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['endpoint']} {r['metric']} ({r['images']} images, {r['vins']} VINs): "
+                  f"{r['baseline']} -> {r['current']} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
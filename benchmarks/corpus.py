@@ -0,0 +1,85 @@
+"""
+Synthetic corpus generator for the VIN GUI benchmarks
+"""
+import os
+import json
+import random
+import shutil
+import time
+from io import BytesIO
+from PIL import Image, ImageDraw, ImageFilter
+
+# Raw images match the camera output seen in production
+IMAGE_SIZE = (2304, 4096)
+JPEG_QUALITY = 85
+
+# Distinct images rendered per corpus; the rest are byte copies of these
+TEMPLATE_COUNT = 4
+
+VIN_STEM = "MD9B10XF5CA"
+
+
+def make_vin(index):
+    """Return a full 17-character VIN for index"""
+    return f"{VIN_STEM}{index:06d}"
+
+
+def render_template_image(seed):
+    """Render a noisy, textured JPEG of realistic size and return its bytes"""
+    rng = random.Random(seed)
+    small = Image.effect_noise((IMAGE_SIZE[0] // 16, IMAGE_SIZE[1] // 16), 40)
+    img = small.resize(IMAGE_SIZE, Image.BICUBIC).convert('RGB')
+
+    # Stamped-looking text and scratches so the encoder has real detail to work with
+    draw = ImageDraw.Draw(img)
+    for _ in range(400):
+        x, y = rng.randrange(IMAGE_SIZE[0]), rng.randrange(IMAGE_SIZE[1])
+        draw.line((x, y, x + rng.randrange(-80, 80), y + rng.randrange(-80, 80)),
+                  fill=(rng.randrange(256),) * 3, width=rng.randrange(1, 4))
+    draw.text((IMAGE_SIZE[0] // 4, IMAGE_SIZE[1] // 2), make_vin(seed), fill=(230, 230, 230))
+    img = img.filter(ImageFilter.GaussianBlur(1.0))
+
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_corpus(base_dir, image_count, vin_count, processed_fraction=0.25, seed=0):
+    """Create raw/processed/cache directories and a VIN sheet under base_dir
+
+    Returns a dict with the directory paths and the VINs (last 6 characters)
+    that are still pending.
+    """
+    raw_dir = os.path.join(base_dir, "raw")
+    processed_dir = os.path.join(base_dir, "processed")
+    cache_dir = os.path.join(base_dir, "cache")
+    for directory in (raw_dir, processed_dir, cache_dir):
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+    templates = [render_template_image(seed + i) for i in range(TEMPLATE_COUNT)]
+    for i in range(image_count):
+        with open(os.path.join(raw_dir, f"IMG_{i:06d}.jpg"), "wb") as f:
+            f.write(templates[i % len(templates)])
+
+    # A share of the sheet is already processed
+    vins = [make_vin(i) for i in range(vin_count)]
+    processed = int(vin_count * processed_fraction)
+    for i, vin in enumerate(vins[:processed]):
+        with open(os.path.join(processed_dir, f"VIN-B1024-{vin[-6:]}.jpg"), "wb") as f:
+            f.write(templates[i % len(templates)])
+
+    # Seed the sheet cache so the benchmark never touches the network
+    csv_text = "\n".join(vins)
+    with open(os.path.join(cache_dir, "manifest.csv"), "w", encoding="utf-8") as f:
+        f.write(csv_text)
+    with open(os.path.join(cache_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"etag": None, "last_modified": None, "fetched_at": time.time()}, f)
+
+    return {
+        "raw_dir": raw_dir,
+        "processed_dir": processed_dir,
+        "cache_dir": cache_dir,
+        "pending_vins": [vin[-6:] for vin in vins[processed:]],
+        "processed_vins": [vin[-6:] for vin in vins[:processed]]
+    }
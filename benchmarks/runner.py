@@ -0,0 +1,153 @@
+"""
+Endpoint benchmark runner for VIN GUI application
+"""
+import os
+import time
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import vin_data
+from vin_data import initialize_config
+from vin_gui import create_app
+from flask_routes import shutdown_routes
+from benchmarks.corpus import generate_corpus
+
+PERCENTILES = (50, 95, 99)
+
+
+def summarize(samples, wall_time):
+    """Return latency percentiles (ms) and throughput for a list of per-request seconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    summary = {"count": len(ordered)}
+    for pct in PERCENTILES:
+        # Nearest-rank percentile
+        rank = max(1, -(-pct * len(ordered) // 100))
+        summary[f"p{pct}_ms"] = round(ordered[rank - 1] * 1000, 3)
+    summary["mean_ms"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    summary["throughput_rps"] = round(len(ordered) / wall_time, 2) if wall_time > 0 else None
+    return summary
+
+
+def timed(requests_to_run):
+    """Run (callable, check) pairs and return (samples, wall_time)"""
+    samples = []
+    wall_start = time.perf_counter()
+    for call, check in requests_to_run:
+        start = time.perf_counter()
+        response = call()
+        samples.append(time.perf_counter() - start)
+        if not check(response):
+            raise RuntimeError(f"Unexpected response {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return samples, time.perf_counter() - wall_start
+
+
+def ok(response):
+    return response.status_code == 200
+
+
+def json_success(response):
+    return response.status_code == 200 and response.get_json().get("success")
+
+
+def run_case(base_dir, image_count, vin_count, repeat=20):
+    """Benchmark every endpoint against a fresh corpus of image_count images and vin_count VINs"""
+    corpus = generate_corpus(base_dir, image_count, vin_count)
+    # No prefetch, or the cold passes would time renders warmed while the previous image was served
+    initialize_config(corpus["raw_dir"], corpus["processed_dir"], "VIN-B1024-",
+                      cache_dir=corpus["cache_dir"], prefetch_depth=0)
+
+    # Each case gets its own sheet cache, loaded from the seeded copy on disk
+    vin_data.manifest = vin_data.ManifestCache(vin_data.CSV_URL, corpus["cache_dir"], ttl=float("inf"))
+
+    app = create_app()
+    try:
+        return {"images": image_count, "vins": vin_count, "endpoints": run_endpoints(app, corpus, repeat)}
+    finally:
+        # Stop this case's executors, pools and prefetch queue before the next case starts
+        shutdown_routes()
+
+
+def run_endpoints(app, corpus, repeat):
+    """Time each endpoint in turn and return {name: summary}"""
+    client = app.test_client()
+    images = [image["name"] for image in client.get("/api/images").get_json()["images"]]
+    results = {}
+
+    def record(name, requests_to_run):
+        samples, wall_time = timed(requests_to_run)
+        results[name] = summarize(samples, wall_time)
+
+    record("api_images", [(lambda: client.get("/api/images"), ok)] * repeat)
+    record("api_vins", [(lambda: client.get("/api/vins"), ok)] * repeat)
+
+    # Image reads: first pass renders, second pass is served from the cache
+    sample = images[:repeat]
+    for mode in ("original", "inverted"):
+        for size in ("full", "screen"):
+            reads = [(lambda f=f: client.get(f"/image/{f}?mode={mode}&size={size}"), ok) for f in sample]
+            record(f"image_{mode}_{size}_cold", reads)
+            record(f"image_{mode}_{size}_warm", reads)
+
+    # Saves consume raw images and pending VINs, so split what is left between them
+    remaining = images[len(sample):] or images
+    saves = min(repeat, len(remaining) // 2, len(corpus["pending_vins"]))
+    rename_files = remaining[:saves]
+    duplicate_files = remaining[saves:saves * 2]
+
+    record("api_rename", [
+        (lambda f=f, v=v: client.post("/api/rename", json={"filename": f, "vin": v}), json_success)
+        for f, v in zip(rename_files, corpus["pending_vins"])
+    ])
+
+    # Duplicates of already-processed VINs, alternating between the two choices
+    resolutions = []
+    for i, (f, v) in enumerate(zip(duplicate_files, corpus["processed_vins"] or corpus["pending_vins"])):
+        resolutions.append((lambda f=f, v=v, choice=("new", "existing")[i % 2]: client.post(
+            "/api/resolve-duplicate",
+            json={"existing_file": f"VIN-B1024-{v}.jpg", "new_file": f, "vin": v, "choice": choice}
+        ), json_success))
+    record("api_resolve_duplicate", resolutions)
+    return results
+
+
+def environment_info():
+    """Describe the machine and commit the results were taken on"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """Return regressions where a p50/p95/p99 latency grew by more than threshold"""
+    regressions = []
+    baseline_cases = {(case["images"], case["vins"]): case for case in baseline["results"]}
+    for case in current["results"]:
+        base = baseline_cases.get((case["images"], case["vins"]))
+        if not base:
+            continue
+        for endpoint, stats in case["endpoints"].items():
+            base_stats = base["endpoints"].get(endpoint, {})
+            for pct in PERCENTILES:
+                key = f"p{pct}_ms"
+                if base_stats.get(key) and stats.get(key) and stats[key] > base_stats[key] * (1 + threshold):
+                    regressions.append({
+                        "images": case["images"],
+                        "vins": case["vins"],
+                        "endpoint": endpoint,
+                        "metric": key,
+                        "baseline": base_stats[key],
+                        "current": stats[key]
+                    })
+    return regressions
@@ -0,0 +1,208 @@
+"""
+Change feed of image and VIN status updates for VIN GUI application
+"""
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Log size above which it is started afresh; clients holding an older cursor reload
+CHANGE_LOG_MAX_BYTES = 4 * 1024 * 1024
+
+# Seconds between checks of the log for new changes while streaming
+POLL_INTERVAL = 0.5
+
+# Seconds between comments sent on an idle stream, so dead connections are noticed
+HEARTBEAT_SECONDS = 15
+
+# Seconds a stream stays open before the browser is asked to reconnect from its last event
+STREAM_SECONDS = 120
+
+# Milliseconds the browser waits before reconnecting a closed stream
+RECONNECT_MS = 1000
+
+# Open streams per process; each one holds a request thread
+DEFAULT_MAX_STREAMS = 8
+
+
+class ChangeFeed:
+    """Append-only log of changes made through the app, shared by all worker processes
+
+    Each change is one JSON line. A position in the feed is a cursor
+    "<epoch>-<offset>": the log's epoch and the byte offset just after a
+    change, so reading what happened since a cursor is a seek and a read. When
+    the log outgrows max_bytes it is started afresh under a new epoch, and
+    readers holding an old cursor are told to reset.
+    """
+
+    def __init__(self, path, max_bytes=CHANGE_LOG_MAX_BYTES, max_streams=DEFAULT_MAX_STREAMS):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.max_bytes = max_bytes
+        self.max_streams = max_streams
+        self.streams = 0
+        self.closed = threading.Event()
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._exclusive():
+            if self._read_epoch() is None:
+                self._start_log()
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the in-process and cross-process append locks"""
+        with self.lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_epoch(self):
+        """Return the epoch of the current log, or None if it is missing or unreadable"""
+        try:
+            with open(self.path, "rb") as f:
+                line = f.readline()
+            return json.loads(line)["epoch"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _start_log(self):
+        """Replace the log with an empty one under a new epoch (lock must be held)"""
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"epoch": uuid.uuid4().hex[:12]}) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def append(self, change_type, **fields):
+        """Record a change and return it with its cursor"""
+        change = {"type": change_type, **fields, "time": time.time()}
+        line = (json.dumps(change) + "\n").encode("utf-8")
+        with self._exclusive():
+            epoch = self._read_epoch()
+            if epoch is None or os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self._start_log()
+                epoch = self._read_epoch()
+            with open(self.path, "ab") as f:
+                f.write(line)
+                offset = f.tell()
+        change["cursor"] = f"{epoch}-{offset:x}"
+        return change
+
+    def cursor(self):
+        """Return the cursor just after the latest change"""
+        with open(self.path, "rb") as f:
+            epoch = json.loads(f.readline())["epoch"]
+            size = os.fstat(f.fileno()).st_size
+        return f"{epoch}-{size:x}"
+
+    def since(self, cursor=None, limit=None):
+        """Return (changes, cursor, reset) for changes recorded after cursor
+
+        Without a cursor every change still in the log is returned. reset is
+        True when the cursor belongs to an earlier log or is malformed; the
+        caller has missed changes and should reload the full state.
+        """
+        with open(self.path, "rb") as f:
+            header = f.readline()
+            epoch = json.loads(header)["epoch"]
+            start = len(header)
+            size = os.fstat(f.fileno()).st_size
+
+            offset, reset = start, False
+            if cursor:
+                cursor_epoch, _, cursor_offset = cursor.partition("-")
+                try:
+                    offset = int(cursor_offset, 16)
+                except ValueError:
+                    offset = None
+                if cursor_epoch != epoch or offset is None or not start <= offset <= size:
+                    return [], f"{epoch}-{self._complete_end(f, start, size):x}", True
+
+            # Only the tail after the cursor is read, however long the log has grown
+            f.seek(offset)
+            data = f.read(size - offset)
+        data = data[:data.rfind(b"\n") + 1]  # ignore a line still being written
+
+        changes = []
+        position = offset
+        for line in data.splitlines(keepends=True):
+            if limit is not None and len(changes) >= limit:
+                break
+            position += len(line)
+            change = json.loads(line)
+            change["cursor"] = f"{epoch}-{position:x}"
+            changes.append(change)
+        return changes, f"{epoch}-{position:x}", reset
+
+    @staticmethod
+    def _complete_end(f, start, size):
+        """Offset just after the last complete line, reading back only as far as that line"""
+        position = size
+        while position > start:
+            step = min(4096, position - start)
+            f.seek(position - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline != -1:
+                return position - step + newline + 1
+            position -= step
+        return start
+
+    def open_stream(self):
+        """Reserve a stream slot; returns False when max_streams are already open"""
+        with self.lock:
+            if self.closed.is_set() or self.streams >= self.max_streams:
+                return False
+            self.streams += 1
+            return True
+
+    def release_stream(self):
+        """Give back a slot taken by open_stream"""
+        with self.lock:
+            self.streams -= 1
+
+    def stream(self, cursor=None):
+        """Yield Server-Sent Events for changes after cursor until the stream times out or the feed closes
+
+        Each change is a message whose id is its cursor, so a browser that
+        reconnects resumes from the last change it saw via Last-Event-ID.
+        """
+        yield f"retry: {RECONNECT_MS}\n\n"
+        deadline = time.monotonic() + STREAM_SECONDS
+        last_event = time.monotonic()
+        seen = None
+        while not self.closed.is_set() and time.monotonic() < deadline:
+            try:
+                stat = os.stat(self.path)
+                signature = (stat.st_ino, stat.st_size)
+            except OSError:
+                signature = None
+
+            if signature != seen:
+                seen = signature
+                changes, next_cursor, reset = self.since(cursor)
+                if reset:
+                    yield f"event: reset\nid: {next_cursor}\ndata: {{}}\n\n"
+                for change in changes:
+                    yield f"id: {change['cursor']}\ndata: {json.dumps(change)}\n\n"
+                if reset or changes:
+                    last_event = time.monotonic()
+                cursor = next_cursor
+
+            if time.monotonic() - last_event >= HEARTBEAT_SECONDS:
+                yield ": keep-alive\n\n"
+                last_event = time.monotonic()
+            self.closed.wait(POLL_INTERVAL)
+
+    def close(self):
+        """End open streams so shutdown doesn't wait for them"""
+        self.closed.set()
@@ -0,0 +1,202 @@
+"""
+Atomic, journaled file operations for VIN GUI application
+"""
+import os
+import json
+import uuid
+import shutil
+import threading
+from contextlib import contextmanager
+
+from metrics import get_metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Linux ioctl to clone file extents (reflink) on filesystems that support it
+FICLONE = 0x40049409
+
+# Journal size above which it is truncated after a commit
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+
+def _temp_path(dest):
+    """Return an unused temp path next to dest"""
+    directory = os.path.dirname(dest) or "."
+    return os.path.join(directory, f".{os.path.basename(dest)}.{uuid.uuid4().hex}.tmp")
+
+
+def _fsync_dir(directory):
+    """Flush directory entries to disk where the platform allows it"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _reflink(source, dest):
+    """Clone source into a new file at dest; return False if unsupported"""
+    if fcntl is None:
+        return False
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            pass
+    os.remove(dest)
+    return False
+
+
+def copy_exact(source, dest):
+    """Byte-exact copy of source to dest, published atomically with os.replace
+
+    Uses a reflink when the filesystem supports it, then a hard link, and
+    falls back to a streamed copy.
+    """
+    tmp_path = _temp_path(dest)
+    try:
+        if not _reflink(source, tmp_path):
+            try:
+                os.link(source, tmp_path)
+            except OSError:
+                shutil.copyfile(source, tmp_path)
+                with open(tmp_path, "rb+") as f:
+                    os.fsync(f.fileno())
+        shutil.copystat(source, tmp_path)
+        os.replace(tmp_path, dest)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(os.path.dirname(dest))
+
+
+def copy_op(source, dest):
+    """Build a copy operation for CommitEngine.commit"""
+    return {"op": "copy", "src": source, "dst": dest}
+
+
+def rename_op(source, dest):
+    """Build a rename operation for CommitEngine.commit"""
+    return {"op": "rename", "src": source, "dst": dest}
+
+
+class CommitEngine:
+    """Applies groups of file operations with a write-ahead journal for crash recovery
+
+    Commits are serialized, across processes too, with an exclusive lock on a
+    file next to the journal. While the lock is held no other commit is in
+    flight, so replay and compaction never touch another worker's commit.
+    """
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.lock_path = journal_path + ".lock"
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the in-process and cross-process commit locks"""
+        with self.lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def commit(self, operations):
+        """Journal the operations, apply them in order, then mark them done"""
+        txid = uuid.uuid4().hex
+        with get_metrics().timer("commit"), self._exclusive():
+            self._append({"id": txid, "state": "begin", "ops": operations})
+            state = "failed"
+            try:
+                for operation in operations:
+                    self._apply(operation)
+                state = "done"
+            finally:
+                self._append({"id": txid, "state": state})
+                self._compact()
+
+    def replay(self):
+        """Finish commits interrupted by a crash; return how many were replayed"""
+        with self._exclusive():
+            pending = {}
+            try:
+                with open(self.journal_path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue  # torn write from a crash
+                        if record.get("state") == "begin":
+                            pending[record["id"]] = record["ops"]
+                        else:
+                            pending.pop(record.get("id"), None)
+            except FileNotFoundError:
+                return 0
+
+            for txid, operations in pending.items():
+                try:
+                    self._replay_operations(operations)
+                    self._append({"id": txid, "state": "done"})
+                except Exception as e:
+                    print(f"Error replaying journal entry {txid}: {e}")
+                    self._append({"id": txid, "state": "failed"})
+
+            self._compact(force=True)
+            return len(pending)
+
+    def close(self):
+        """Wait for the commit in progress, if any, and truncate the journal"""
+        with self._exclusive():
+            self._compact(force=True)
+
+    def _replay_operations(self, operations):
+        """Re-apply operations idempotently, skipping those that already took effect"""
+        for index, operation in enumerate(operations):
+            if operation["op"] == "copy":
+                source = operation["src"]
+                if not os.path.exists(source):
+                    # The source may already have been renamed by a later step
+                    renamed = [op["dst"] for op in operations[index + 1:]
+                               if op["op"] == "rename" and op["src"] == source]
+                    source = renamed[0] if renamed and os.path.exists(renamed[0]) else None
+                if source:
+                    copy_exact(source, operation["dst"])
+            elif operation["op"] == "rename":
+                if os.path.exists(operation["src"]) and not os.path.exists(operation["dst"]):
+                    self._apply(operation)
+
+    def _apply(self, operation):
+        if operation["op"] == "copy":
+            copy_exact(operation["src"], operation["dst"])
+        elif operation["op"] == "rename":
+            os.replace(operation["src"], operation["dst"])
+            _fsync_dir(os.path.dirname(operation["dst"]))
+        else:
+            raise ValueError(f"Unknown journal operation: {operation['op']}")
+
+    def _append(self, record):
+        """Durably append a record to the journal (commit locks must be held)"""
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact(self, force=False):
+        """Truncate the journal (commit locks must be held, so nothing is in flight)"""
+        try:
+            if force or os.path.getsize(self.journal_path) > JOURNAL_COMPACT_BYTES:
+                os.truncate(self.journal_path, 0)
+        except FileNotFoundError:
+            pass
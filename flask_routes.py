@@ -2,19 +2,208 @@
 Flask routes for VIN GUI application
 """
 import os
-import glob
 import re
-import tempfile
-from flask import jsonify, request, send_file, send_from_directory, render_template, url_for
-from PIL import Image, ImageOps, ImageEnhance
-
-from vin_data import get_config, load_csv_data, extract_vin_from_filename
-
-# Image processing cache
-image_cache = {}
+import time
+import zlib
+from datetime import datetime, timezone
+from flask import Response, g, jsonify, make_response, request, send_file, send_from_directory, render_template, url_for
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
+
+from vin_data import get_config, get_manifest, get_processed_index, load_csv_data, extract_vin_from_filename
+from image_processor import MODES, RENDERED_MODES, SIZE_CLASSES, OUTPUT_QUALITY
+from image_cache import DerivedImageCache
+from image_prefetch import Prefetcher
+from image_pool import init_image_pool
+from image_transforms import TransformExecutor, TransformQueueFull, RETRY_AFTER
+from image_listing import get_raw_listing, file_version, image_record
+from file_commit import CommitEngine, copy_op, rename_op
+from change_feed import ChangeFeed
+from metrics import get_metrics, collect, render_prometheus
+from profiling import Profiler
+from review_queue import ReviewQueue, default_queue_path
+
+# Browsers may keep URLs carrying the current file version for a year; anything else is revalidated
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Requests carrying this header are profiled whatever the sampling rate
+PROFILE_HEADER = 'X-Profile'
+
+# Orderings offered for text profile summaries
+PROFILE_SORTS = ('cumulative', 'tottime', 'calls')
+
+# Largest page of images or changes returned by one request
+MAX_PAGE_SIZE = 5000
+
+# Derived image cache, image process pool, render executor, prefetcher, file commit engine, change feed,
+# profiler and OCR review queue, created in setup_routes
+image_cache = None
+image_pool = None
+transforms = None
+prefetcher = None
+commit_engine = None
+change_feed = None
+profiler = None
+review_queue = None
+
+def page_limit():
+    """Read the limit query parameter, clamped to 1..MAX_PAGE_SIZE; None when not given"""
+    limit = request.args.get('limit', type=int)
+    return None if limit is None else min(max(limit, 1), MAX_PAGE_SIZE)
+
+def end_streams():
+    """End open change streams, which would otherwise hold up draining requests on shutdown"""
+    if change_feed:
+        change_feed.close()
+
+def shutdown_routes():
+    """Stop background renders and flush the journal and VIN sheet cache before exiting"""
+    end_streams()
+    if prefetcher:
+        prefetcher.close()
+    if transforms:
+        transforms.close()
+    if image_pool:
+        image_pool.close()
+    if commit_engine:
+        commit_engine.close()
+    get_manifest().close()
+    get_metrics().close(metrics_dir())
+
+def metrics_dir():
+    """Directory where each worker process leaves its latest metrics snapshot"""
+    return os.path.join(get_config()['cache_dir'], 'metrics')
+
+def file_validators(path, variant=''):
+    """Return (version, ETag, Last-Modified) for a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    version = file_version(stat)
+    etag = f"{version}-{variant}" if variant else version
+    return version, etag, datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+
+def set_cache_policy(response, versioned):
+    """Mark versioned responses immutable; make browsers revalidate everything else"""
+    if versioned:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def not_modified(etag, last_modified, versioned):
+    """Return a 304 response if the request's validators still match, else None"""
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return set_cache_policy(response, versioned)
+
+def send_validated(path, etag, last_modified, versioned, mimetype=None):
+    """Send a file with our validators, byte-range support and cache policy"""
+    response = send_file(path, mimetype=mimetype, etag=etag, last_modified=last_modified, conditional=True)
+    return set_cache_policy(response, versioned)
+
+def send_rendered(image_path, mode, size, etag, last_modified, versioned):
+    """Render through the executor and send the cached file"""
+    for attempt in range(2):
+        cached_path = transforms.render(image_path, mode, image_pool.render_image, size=size, quality=OUTPUT_QUALITY)
+        try:
+            return send_validated(cached_path, etag, last_modified, versioned, mimetype='image/jpeg')
+        except FileNotFoundError:
+            # Evicted by another worker process between lookup and send; render it again
+            if attempt:
+                raise
+
+def publish(change_type, **fields):
+    """Record a change in the feed and return it, or None if it couldn't be written"""
+    try:
+        return change_feed.append(change_type, **fields)
+    except OSError as e:
+        # The save itself went through; other operators see it on their next reload
+        print(f"Error recording change: {e}")
+        return None
+
+def publish_save(vin, processed_file=None, old_name=None, new_name=None):
+    """Publish what a save changed: the processed file written and the raw file renamed"""
+    config = get_config()
+    changes = []
+    if processed_file:
+        processed_count = get_processed_index().count_with_prefix(config['prefix'])
+        changes.append(publish('vin_matched', vin=vin, file=processed_file, processed_count=processed_count))
+    if new_name:
+        version = get_raw_listing().versions_for([new_name]).get(new_name)
+        # DONE_ names are processed whatever the VIN sheet says, so no matched VINs are needed
+        changes.append(publish('renamed', old=old_name, record=image_record(new_name, version, ())))
+    return [change for change in changes if change]
+
+def resolve_review(filename):
+    """Take a saved or deleted image off the OCR review queue; returns the change published, if any"""
+    try:
+        if review_queue.remove(filename):
+            return publish('reviewed', name=filename)
+    except OSError as e:
+        print(f"Error updating review queue: {e}")
+    return None
 
 def setup_routes(app):
     """Setup all Flask routes"""
+    global image_cache, image_pool, transforms, prefetcher, commit_engine, change_feed, profiler, review_queue
+    config = get_config()
+    image_cache = DerivedImageCache(config['cache_dir'], config['cache_max_bytes'])
+    # Render threads only queue work and wait; decoding and encoding run in the pool's processes
+    image_pool = init_image_pool(config['image_workers'])
+    transforms = TransformExecutor(image_cache, config['render_workers'], config['render_queue'],
+                                   background_workers=config['prefetch_workers'])
+    prefetcher = Prefetcher(image_cache, transforms, config['prefetch_depth'], render=image_pool.render_modes)
+
+    # Finish any save interrupted by a crash before serving requests
+    commit_engine = CommitEngine(os.path.join(config['cache_dir'], 'commit_journal.jsonl'))
+    replayed = commit_engine.replay()
+    if replayed:
+        print(f"Recovered {replayed} interrupted save(s) from the journal")
+    change_feed = ChangeFeed(os.path.join(config['cache_dir'], 'changes.jsonl'))
+    get_metrics().start_flushing(metrics_dir())
+    profiler = Profiler(config['profile_dir'] or os.path.join(config['cache_dir'], 'profiles'),
+                        config['profile_rate'], config['profile_keep'])
+    review_queue = ReviewQueue(config['review_queue'] or default_queue_path(config['raw_dir'], config['cache_dir']))
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.profile = profiler.start(force=request.headers.get(PROFILE_HEADER) == '1')
+
+    def finish_profile():
+        """Save the request's profile, if it has one, and return its name"""
+        profile = g.pop('profile', None)
+        if profile is None:
+            return None
+        return profiler.stop(profile, f"{request.method}-{request.endpoint or 'unmatched'}")
+
+    @app.after_request
+    def record_request(response):
+        """Time every request by endpoint; streamed responses are timed until their headers are ready"""
+        start = g.get('request_start')
+        if start is not None:
+            endpoint = request.endpoint or 'unmatched'
+            metrics = get_metrics()
+            metrics.observe('vin_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+            metrics.inc('vin_requests_total', endpoint=endpoint, status=str(response.status_code))
+
+        profile_name = finish_profile()
+        if profile_name:
+            response.headers['X-Profile-Id'] = profile_name
+        return response
+
+    @app.teardown_request
+    def end_profile(error):
+        # after_request doesn't run when a view raises
+        finish_profile()
 
     @app.route('/')
     def index():
@@ -37,36 +226,92 @@ def setup_routes(app):
         })
     @app.route('/api/images')
     def get_images():
-        """Get list of images in the raw directory"""
+        """Get a page of images in the raw directory"""
         config = get_config()
         
         if not config['raw_dir'] or not os.path.exists(config['raw_dir']):
             return jsonify({
                 'images': [],
-                'processed_count': 0
+                'processed_count': 0,
+                'total': 0,
+                'review_count': 0,
+                'next_cursor': None,
+                'changes_cursor': change_feed.cursor()
             })
-            
-        image_files = sorted(
-            glob.glob(os.path.join(config['raw_dir'], '*.jpg')) +
-            glob.glob(os.path.join(config['raw_dir'], '*.jpeg')) +
-            glob.glob(os.path.join(config['raw_dir'], '*.png'))
-        )
-
-        # Count processed files
-        processed_count = 0
-        if os.path.exists(config['processed_dir']):
-            processed_count = len([f for f in os.listdir(config['processed_dir'])
-                                  if f.lower().startswith(config['prefix'].lower()) and
-                                  os.path.isfile(os.path.join(config['processed_dir'], f))])
-
-        # Sort files to prioritize unprocessed ones (those not starting with "DONE_")
-        image_files = sorted(image_files, key=lambda f: os.path.basename(f).startswith("DONE_"))
 
+        cursor = request.args.get('cursor') or None
+        limit = page_limit()
+
+        # Taken before reading state, so a change made meanwhile is replayed rather than missed
+        changes_cursor = change_feed.cursor()
+        raw_listing = get_raw_listing()
+        raw_listing.refresh()
+        processed_index = get_processed_index()
+        processed_count = processed_index.count_with_prefix(config['prefix'])
+        manifest = get_manifest()
+        manifest_vins = manifest.get_vins()
+        review = review_queue.entries()
+
+        names, next_cursor = raw_listing.page(cursor, limit)
+        versions = raw_listing.versions_for(names)
+
+        # Unchanged listing, processed files, VIN sheet, review queue and page files: let the client
+        # reuse its copy. Built only from state every worker process sees: directory mtimes, the sheet's
+        # digest, the review queue file, the change feed offset, which moves on every rename or delete,
+        # and the page's file versions, which move when an image is overwritten in place
+        page_version = zlib.crc32("\n".join(f"{name} {version}" for name, version in versions.items()).encode('utf-8'))
+        etag = (f"{raw_listing.dir_mtime}-{processed_index.dir_mtime}-{manifest.version}-"
+                f"{review_queue.version()}-{changes_cursor}-{page_version:x}")
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+            response.set_etag(etag)
+            return response
+
+        # Same rule the client used: renamed to DONE_, or its VIN is in the sheet and already processed
+        matched_vins = processed_index.matched_among(manifest_vins, manifest.version)
+        records = []
+        for name in names:
+            record = image_record(name, versions.get(name), matched_vins)
+            if name in review:
+                # OCR couldn't read it; the client lists it for review with the best guess filled in
+                record['review'] = review[name]
+            records.append(record)
+        response = jsonify({
+            'images': records,
+            'processed_count': processed_count,
+            'total': len(raw_listing.names),
+            'review_count': sum(1 for name in review if name in raw_listing.members),
+            'next_cursor': next_cursor,
+            'changes_cursor': changes_cursor
+        })
+        response.set_etag(etag)
+        return response
+
+    @app.route('/api/changes')
+    def get_changes():
+        """Return changes recorded after the since cursor"""
+        changes, cursor, reset = change_feed.since(request.args.get('since'), page_limit())
         return jsonify({
-            'images': [os.path.basename(f) for f in image_files],
-            'processed_count': processed_count
+            'changes': changes,
+            'cursor': cursor,
+            'reset': reset
         })
 
+    @app.route('/api/changes/stream')
+    def stream_changes():
+        """Stream changes as Server-Sent Events, resuming from Last-Event-ID after a reconnect"""
+        cursor = request.headers.get('Last-Event-ID') or request.args.get('since') or change_feed.cursor()
+        if not change_feed.open_stream():
+            response = make_response("Too many open streams", 503)
+            response.headers['Retry-After'] = str(RETRY_AFTER)
+            return response
+
+        response = Response(change_feed.stream(cursor), mimetype='text/event-stream')
+        response.call_on_close(change_feed.release_stream)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # let reverse proxies pass events straight through
+        return response
+
     @app.route('/api/vins')
     def get_vins():
         """Get VIN data"""
@@ -77,54 +322,89 @@ def setup_routes(app):
         """Serve an image from the raw images directory with processing"""
         config = get_config()
         mode = request.args.get('mode', 'original')
+        if mode not in MODES:
+            mode = 'original'
+        size = request.args.get('size', 'full')
+        if size not in SIZE_CLASSES:
+            size = 'full'
         image_path = os.path.join(config['raw_dir'], filename)
 
-        if not os.path.exists(image_path):
+        # Validators come from the source file and the rendition, not the cached file
+        validators = file_validators(image_path, f"{mode}-{size}-{OUTPUT_QUALITY}")
+        if validators is None:
             return "Image not found", 404
-
-        # Check if we have this image in cache
-        cache_key = f"{image_path}_{mode}"
-        if cache_key in image_cache and os.path.exists(image_cache[cache_key]):
-            return send_file(image_cache[cache_key])
-
-        # Process image based on mode
-        try:
-            img = Image.open(image_path)
-            
-            if mode == 'original':
-                output = img
-            elif mode == 'inverted':
-                # Create high contrast inverted image
-                # Convert to grayscale
-                output = img.convert('L')
-                
-                # Increase contrast
-                enhancer = ImageEnhance.Contrast(output)
-                output = enhancer.enhance(2.0)
-                
-                # Invert colors to help with embossed text
-                output = ImageOps.invert(output)
+        version, etag, last_modified = validators
+        versioned = request.args.get('v') == version
+
+        response = not_modified(etag, last_modified, versioned)
+        if response is None:
+            # Full-size originals are served as-is, without a decode/encode round trip
+            if mode not in RENDERED_MODES and size == 'full':
+                response = send_validated(image_path, etag, last_modified, versioned)
             else:
-                output = img
-                
-            # Create a temporary file to return
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-                temp_path = tmp.name
-                output.save(temp_path, format='JPEG')
-                
-            # Add to cache
-            image_cache[cache_key] = temp_path
-            
-            return send_file(temp_path)
-        except Exception as e:
-            print(f"Error processing image: {e}")
-            return send_file(image_path)
+                try:
+                    response = send_rendered(image_path, mode, size, etag, last_modified, versioned)
+                except (TransformQueueFull, TimeoutError):
+                    # Shed load rather than queue more decodes than memory and CPU allow
+                    response = make_response("Server busy, please retry", 503)
+                    response.headers['Retry-After'] = str(RETRY_AFTER)
+                    return response
+                except Exception as e:
+                    print(f"Error processing image: {e}")
+                    response = send_file(image_path)
+
+        # Warm the images the operator is likely to open next, once this one is ready
+        queued = review_queue.entries() if request.args.get('review') else None
+        prefetcher.schedule(filename, mode, size, queued, client=request.args.get('client'))
+        return response
+
+    @app.route('/api/cache/stats')
+    def get_cache_stats():
+        """Return derived image cache, render executor, image pool and prefetch counters"""
+        stats = image_cache.stats()
+        stats['transforms'] = transforms.stats()
+        stats['image_pool'] = image_pool.stats()
+        stats['prefetch'] = prefetcher.stats()
+        return jsonify(stats)
+
+    @app.route('/api/metrics')
+    def get_metrics_text():
+        """Return request and stage metrics from all worker processes in Prometheus text format"""
+        counters, histograms = collect(metrics_dir())
+        return Response(render_prometheus(counters, histograms), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/api/profiles')
+    def list_profiles():
+        """List saved request profiles, newest first"""
+        return jsonify({'profiles': profiler.list(), 'rate': profiler.rate})
+
+    @app.route('/api/profiles/<name>')
+    def get_profile(name):
+        """Download a saved profile, or with format=text show its top functions"""
+        path = profiler.path_for(name)
+        if path is None:
+            return "Profile not found", 404
+        if request.args.get('format') == 'text':
+            sort = request.args.get('sort', 'cumulative')
+            if sort not in PROFILE_SORTS:
+                sort = 'cumulative'
+            text = profiler.summary(name, sort, request.args.get('limit', 40, type=int))
+            return Response(text, mimetype='text/plain')
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
 
     @app.route('/processed/<path:filename>')
     def serve_processed_image(filename):
         """Serve an image from the processed images directory"""
         config = get_config()
-        return send_from_directory(config['processed_dir'], filename)
+        path = safe_join(config['processed_dir'], filename)
+        validators = file_validators(path) if path else None
+        if validators is None:
+            return "Image not found", 404
+
+        # Saving over an existing VIN replaces the file under the same name, so only versioned URLs are immutable
+        version, etag, last_modified = validators
+        versioned = request.args.get('v') == version
+        return not_modified(etag, last_modified, versioned) or send_validated(path, etag, last_modified, versioned)
 
     @app.route('/api/rename', methods=['POST'])
     def rename_file():
@@ -154,11 +434,10 @@ def setup_routes(app):
         dest_path = os.path.join(config['processed_dir'], new_filename)
 
         # Check if a file with this VIN already exists
-        existing_files = []
-        if os.path.exists(config['processed_dir']):
-            existing_files = [f for f in os.listdir(config['processed_dir'])
-                             if f.lower().endswith(f"{vin.lower()}{file_ext.lower()}") and
-                             os.path.isfile(os.path.join(config['processed_dir'], f))]
+        processed_index = get_processed_index()
+        was_matched = processed_index.has_vin(vin)
+        existing_files = [f for f in processed_index.files_for(vin)
+                          if f.lower().endswith(file_ext.lower())]
 
         if existing_files:
             return jsonify({
@@ -169,30 +448,34 @@ def setup_routes(app):
             })
 
         try:
-            # Save to processed directory
-            original_image = Image.open(source_path)
-            original_image.save(dest_path)
-            
-            # Rename the original file to mark it as processed
+            # Copy to processed directory and mark the original as processed, as one commit
+            operations = [copy_op(source_path, dest_path)]
             raw_renamed = False
             raw_new_name = ""
             
             if not filename.startswith("DONE_"):
                 raw_new_name = f"DONE_{vin}_{filename}"
                 new_raw_path = os.path.join(config['raw_dir'], raw_new_name)
-                os.rename(source_path, new_raw_path)
+                operations.append(rename_op(source_path, new_raw_path))
                 raw_renamed = True
 
-            # Check if this VIN is in our CSV data
-            csv_data = load_csv_data()
-            vin_updated = vin.upper() in csv_data['pending']
+            commit_engine.commit(operations)
+            processed_index.add(new_filename)
+            if raw_renamed:
+                get_raw_listing().rename(filename, raw_new_name)
+            changes = [resolve_review(filename)] + publish_save(vin, new_filename, filename, raw_new_name)
+            changes = [change for change in changes if change]
+
+            # Whether this save moved a VIN in our CSV data from pending to matched
+            vin_updated = not was_matched and vin in get_manifest().get_vins()
 
             return jsonify({
                 'success': True,
                 'message': f'Successfully saved as {new_filename}',
                 'vin_updated': vin_updated,
                 'raw_file_renamed': raw_renamed,
-                'raw_file_new_name': raw_new_name
+                'raw_file_new_name': raw_new_name,
+                'changes': changes
             })
         except Exception as e:
             return jsonify({'success': False, 'message': f'Error renaming file: {str(e)}'})
@@ -219,22 +502,29 @@ def setup_routes(app):
                 source_path = os.path.join(config['raw_dir'], new_file)
                 dest_path = os.path.join(config['processed_dir'], existing_file)
 
-                # Save the new image over the existing one
-                original_image = Image.open(source_path)
-                original_image.save(dest_path)
+                # Copy the new image over the existing one
+                operations = [copy_op(source_path, dest_path)]
                 
                 # Rename the original file to mark it as processed
                 if not new_file.startswith("DONE_"):
                     raw_new_name = f"DONE_{vin}_{new_file}"
                     new_raw_path = os.path.join(config['raw_dir'], raw_new_name)
-                    os.rename(source_path, new_raw_path)
+                    operations.append(rename_op(source_path, new_raw_path))
                     raw_renamed = True
 
+                commit_engine.commit(operations)
+                get_processed_index().add(existing_file)
+                if raw_renamed:
+                    get_raw_listing().rename(new_file, raw_new_name)
+                changes = [resolve_review(new_file)] + publish_save(vin, existing_file, new_file, raw_new_name)
+                changes = [change for change in changes if change]
+
                 return jsonify({
                     'success': True, 
                     'message': 'Replaced existing file with new image',
                     'raw_file_renamed': raw_renamed,
-                    'raw_file_new_name': raw_new_name
+                    'raw_file_new_name': raw_new_name,
+                    'changes': changes
                 })
 
             elif choice == 'existing':
@@ -243,14 +533,18 @@ def setup_routes(app):
                     source_path = os.path.join(config['raw_dir'], new_file)
                     raw_new_name = f"DONE_{vin}_{new_file}"
                     new_raw_path = os.path.join(config['raw_dir'], raw_new_name)
-                    os.rename(source_path, new_raw_path)
+                    commit_engine.commit([rename_op(source_path, new_raw_path)])
+                    get_raw_listing().rename(new_file, raw_new_name)
                     raw_renamed = True
+                changes = [resolve_review(new_file)] + publish_save(vin, old_name=new_file, new_name=raw_new_name)
+                changes = [change for change in changes if change]
                 
                 return jsonify({
                     'success': True, 
                     'message': 'Kept existing file', 
                     'raw_file_renamed': raw_renamed,
-                    'raw_file_new_name': raw_new_name
+                    'raw_file_new_name': raw_new_name,
+                    'changes': changes
                 })
 
             else:
@@ -273,20 +567,11 @@ def setup_routes(app):
             file_path = os.path.join(config['raw_dir'], filename)
             if os.path.exists(file_path):
                 os.remove(file_path)
-                return jsonify({'success': True, 'message': f'Deleted {filename}'})
+                get_raw_listing().remove(filename)
+                changes = [resolve_review(filename), publish('deleted', name=filename)]
+                return jsonify({'success': True, 'message': f'Deleted {filename}',
+                                'changes': [change for change in changes if change]})
             else:
                 return jsonify({'success': False, 'message': f'File not found: {filename}'})
         except Exception as e:
             return jsonify({'success': False, 'message': f'Error deleting file: {str(e)}'})
-
-    # Clean up image cache when app shuts down
-    @app.teardown_appcontext
-    def cleanup_image_cache(exception=None):
-        """Clean up temporary image files"""
-        try:
-            for key in list(image_cache.keys()):
-                if os.path.exists(image_cache[key]):
-                    os.remove(image_cache[key])
-            image_cache.clear()
-        except Exception as e:
-            print(f"Error cleaning image cache: {e}")
\ No newline at end of file
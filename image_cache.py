@@ -0,0 +1,165 @@
+"""
+Derived image cache for VIN GUI application
+"""
+import os
+import json
+import hashlib
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+
+from metrics import get_metrics
+
+# Default byte budget for rendered images kept on disk
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+CACHE_SUFFIX = ".jpg"
+
+# Temp files older than this were left by a crashed writer and are removed on startup
+STALE_TEMP_SECONDS = 3600
+
+
+class DerivedImageCache:
+    """On-disk LRU cache of rendered images, keyed by source identity and render parameters
+
+    Several processes can share one cache directory: files are published with
+    os.replace, and entries written by another process are picked up on lookup.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Rebuild the LRU order from files left by previous runs"""
+        found = []
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if entry.name.endswith(CACHE_SUFFIX):
+                found.append((stat.st_mtime, entry.name[:-len(CACHE_SUFFIX)], stat.st_size))
+            elif entry.name.endswith(".tmp") and now - stat.st_mtime > STALE_TEMP_SECONDS:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+        # Hits touch the file mtime, so mtime order is access order
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+
+        with self.lock:
+            self._evict()
+
+    def make_key(self, source_path, mode, **params):
+        """Build a cache key from the source file identity, mode and output params"""
+        stat = os.stat(source_path)
+        identity = [os.path.abspath(source_path), stat.st_size, stat.st_mtime_ns, mode, sorted(params.items())]
+        return hashlib.sha256(json.dumps(identity).encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        """Return the on-disk path for a cache key"""
+        return os.path.join(self.cache_dir, f"{key}{CACHE_SUFFIX}")
+
+    def get(self, key):
+        """Return the cached file path for key, or None on a miss"""
+        path = self.path_for(key)
+        with self.lock:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                self._forget(key)
+                self.misses += 1
+                get_metrics().inc("vin_cache_lookups_total", result="miss")
+                return None
+
+            if key not in self.entries:
+                # Rendered by another process sharing the cache directory
+                self.entries[key] = size
+                self.total_bytes += size
+            self.entries.move_to_end(key)
+            self.hits += 1
+        get_metrics().inc("vin_cache_lookups_total", result="hit")
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def contains(self, key):
+        """Check for key without counting a hit or miss or refreshing its recency"""
+        return os.path.exists(self.path_for(key))
+
+    def put(self, key, data):
+        """Store rendered bytes under key and return the cached file path"""
+        path = self.path_for(key)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self.lock:
+            self._forget(key)
+            self.entries[key] = len(data)
+            self.total_bytes += len(data)
+            self._evict(keep=key)
+        return path
+
+    def get_or_create(self, source_path, mode, render, **params):
+        """Return a cached rendering of source_path, calling render(source_path, mode, **params) on a miss"""
+        key = self.make_key(source_path, mode, **params)
+        path = self.get(key)
+        if path:
+            return path
+        return self.put(key, render(source_path, mode, **params))
+
+    def _forget(self, key):
+        """Drop key from the index (lock must be held)"""
+        size = self.entries.pop(key, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _evict(self, keep=None):
+        """Remove least recently used entries until under budget, sparing keep (lock must be held)"""
+        while self.total_bytes > self.max_bytes and self.entries:
+            key = next(iter(self.entries))
+            if key == keep:
+                break  # keep was just stored, so everything older is already gone
+            size = self.entries.pop(key)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        """Return cache counters"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,155 @@
+"""
+Raw image directory listing for VIN GUI application
+"""
+import os
+import bisect
+import threading
+
+from vin_data import get_config, extract_vin_from_filename
+from metrics import get_metrics
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Above this many changes a rescan re-sorts instead of inserting one by one
+RESORT_THRESHOLD = 1000
+
+
+def is_image_file(filename):
+    """Check whether a filename has a supported image extension"""
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def file_version(stat):
+    """Short token that changes whenever a file's size or modification time changes"""
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def sort_key(filename):
+    """Unprocessed images first (those not starting with "DONE_"), then by name"""
+    return (filename.startswith("DONE_"), filename)
+
+
+def image_record(filename, version, matched_vins):
+    """Per-image status for the client: parsed VIN, processed flag and position in the list"""
+    vin = extract_vin_from_filename(filename)
+    done, name = sort_key(filename)
+    return {
+        'name': filename,
+        'vin': vin,
+        'processed': done or vin in matched_vins,
+        'sort_key': [int(done), name],
+        'version': version
+    }
+
+
+class RawDirectoryListing:
+    """Sorted listing of the raw image directory, rescanned only when the directory changes"""
+
+    def __init__(self, raw_dir):
+        self.raw_dir = raw_dir
+        self.names = []   # sorted by sort_key
+        self.keys = []    # sort_key of each entry in names
+        self.members = set()
+        self.version = 0
+        self.dir_mtime = None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Pick up external changes if the directory mtime moved since the last scan"""
+        try:
+            mtime = os.stat(self.raw_dir).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self.lock:
+            if mtime == self.dir_mtime:
+                return
+            self.dir_mtime = mtime
+
+            found = set()
+            if mtime is not None:
+                with get_metrics().timer("raw_scan"), os.scandir(self.raw_dir) as entries:
+                    found = {entry.name for entry in entries
+                             if is_image_file(entry.name) and entry.is_file()}
+
+            removed = self.members - found
+            added = found - self.members
+            if not removed and not added:
+                return
+
+            if len(removed) + len(added) > RESORT_THRESHOLD:
+                self.members = found
+                self.names = sorted(found, key=sort_key)
+                self.keys = [sort_key(name) for name in self.names]
+            else:
+                for name in removed:
+                    self._remove(name)
+                for name in added:
+                    self._insert(name)
+            self.version += 1
+
+    def rename(self, old_name, new_name):
+        """Record a rename made by the application"""
+        with self.lock:
+            self._remove(old_name)
+            if is_image_file(new_name):
+                self._insert(new_name)
+            self.version += 1
+
+    def remove(self, name):
+        """Record a deletion made by the application"""
+        with self.lock:
+            self._remove(name)
+            self.version += 1
+
+    def versions_for(self, names):
+        """Return {name: file_version} for names, statting each file every time
+
+        A file overwritten in place leaves the directory mtime alone, so a
+        remembered version could outlive the content it was served as immutable for.
+        """
+        versions = {}
+        for name in names:
+            try:
+                versions[name] = file_version(os.stat(os.path.join(self.raw_dir, name)))
+            except OSError:
+                continue
+        return versions
+
+    def page(self, cursor=None, limit=None):
+        """Return (names, next_cursor) for the names sorted after cursor"""
+        self.refresh()
+        with self.lock:
+            start = bisect.bisect_right(self.keys, sort_key(cursor)) if cursor else 0
+            end = len(self.names) if limit is None else min(start + limit, len(self.names))
+            names = self.names[start:end]
+            next_cursor = names[-1] if names and end < len(self.names) else None
+            return names, next_cursor
+
+    def _insert(self, name):
+        if name in self.members:
+            return
+        key = sort_key(name)
+        index = bisect.bisect_left(self.keys, key)
+        self.keys.insert(index, key)
+        self.names.insert(index, name)
+        self.members.add(name)
+
+    def _remove(self, name):
+        if name not in self.members:
+            return
+        index = bisect.bisect_left(self.keys, sort_key(name))
+        del self.keys[index]
+        del self.names[index]
+        self.members.discard(name)
+
+# Raw directory listing, recreated if the raw directory changes
+raw_listing = None
+
+def get_raw_listing():
+    """Get the raw directory listing for the current configuration"""
+    global raw_listing
+    config = get_config()
+    if raw_listing is None or raw_listing.raw_dir != config["raw_dir"]:
+        raw_listing = RawDirectoryListing(config["raw_dir"])
+    return raw_listing
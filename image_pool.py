@@ -0,0 +1,120 @@
+"""
+Process pool for CPU-bound image work in VIN GUI application and VIN OCR Processor
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import image_processor
+from metrics import get_metrics, trace
+
+# Worker processes; each decodes, renders and encodes one image at a time
+DEFAULT_IMAGE_WORKERS = os.cpu_count() or 2
+
+
+def _run_traced(func, args, kwargs):
+    """Run func in a worker process and return (result, {stage: seconds}) for the parent to record"""
+    with trace() as stages:
+        result = func(*args, **kwargs)
+    return result, stages
+
+
+class ImagePool:
+    """Runs decode, resize, mode rendering and JPEG encoding in worker processes
+
+    Decoding, the NumPy modes and encoding mostly hold the GIL, so on threads
+    image work tops out at about one core. Here the caller's thread only waits
+    while a worker process does the work. Results cross back as JPEG bytes or
+    NumPy arrays, never as PIL images. Stage timings measured in the worker are
+    recorded in this process's metrics and the caller's trace(), as if the work
+    had run here.
+
+    Workers start from a fork server that has already imported the image code,
+    so they don't inherit the threads and sockets of the process using the pool.
+    With workers set to 0 everything runs on the calling thread.
+    """
+
+    def __init__(self, workers=DEFAULT_IMAGE_WORKERS):
+        self.workers = workers
+        self.executor = None
+        self.tasks = 0
+        self.restarts = 0
+        self.lock = threading.Lock()
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                if "forkserver" in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context("forkserver")
+                    context.set_forkserver_preload(["image_processor"])
+                else:
+                    context = multiprocessing.get_context("spawn")
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self.tasks += 1
+            return self.executor
+
+    def run(self, func, *args, **kwargs):
+        """Call func(*args, **kwargs) in a worker process and return its result
+
+        func must be a module-level function. If a worker dies, the pool is
+        replaced for the next call and BrokenProcessPool is raised for this one.
+        """
+        if self.workers <= 0:
+            return func(*args, **kwargs)
+
+        executor = self._get_executor()
+        try:
+            result, stages = executor.submit(_run_traced, func, args, kwargs).result()
+        except BrokenProcessPool:
+            with self.lock:
+                if self.executor is executor:
+                    self.executor = None
+                    self.restarts += 1
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        get_metrics().record_stages(stages)
+        return result
+
+    def render_image(self, image_path, mode='original', size='full', quality=image_processor.OUTPUT_QUALITY):
+        """image_processor.render_image in a worker process"""
+        return self.run(image_processor.render_image, image_path, mode, size, quality)
+
+    def render_modes(self, image_path, modes=image_processor.MODES, size='full', quality=image_processor.OUTPUT_QUALITY):
+        """image_processor.render_modes in a worker process"""
+        return self.run(image_processor.render_modes, image_path, tuple(modes), size, quality)
+
+    def stats(self):
+        """Return pool counters"""
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'tasks': self.tasks,
+                'restarts': self.restarts
+            }
+
+    def close(self):
+        """Drop queued work and stop the worker processes"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+# Image pool for this process, created by init_image_pool or on first use
+image_pool = None
+
+def init_image_pool(workers=DEFAULT_IMAGE_WORKERS):
+    """Replace the image pool for this process with one of workers processes"""
+    global image_pool
+    if image_pool is not None:
+        image_pool.close()
+    image_pool = ImagePool(workers)
+    return image_pool
+
+def get_image_pool():
+    """Get the image pool for this process"""
+    global image_pool
+    if image_pool is None:
+        image_pool = ImagePool()
+    return image_pool
@@ -0,0 +1,140 @@
+"""
+Predictive pre-rendering of upcoming images for VIN GUI application
+"""
+import os
+import heapq
+import threading
+from collections import OrderedDict
+
+from image_processor import render_modes, RENDERED_MODES, OUTPUT_QUALITY
+from image_listing import get_raw_listing, sort_key
+
+# How many images ahead to render
+DEFAULT_PREFETCH_DEPTH = 3
+
+# Clients (browser tabs) whose position is remembered; the least recently seen is dropped beyond this
+MAX_CLIENTS = 64
+
+
+class Prefetcher:
+    """Renders the images after the one being viewed so advancing is a cache hit
+
+    Renders run on the transform executor's background pool. Each client
+    (browser tab) has its own set of wanted renders, which each of its requests
+    replaces; that client's queued renders that are no longer wanted are
+    cancelled, so jumping elsewhere doesn't leave the pool busy with images the
+    operator has moved past, and doesn't touch other operators' prefetches.
+    """
+
+    def __init__(self, cache, transforms, depth=DEFAULT_PREFETCH_DEPTH, render=render_modes):
+        self.cache = cache
+        self.transforms = transforms
+        self.depth = depth
+        self.render = render  # render_modes, or a drop-in that runs it elsewhere
+        self.wanted = OrderedDict()  # client -> (raw_dir, filename, size, modes) jobs for its position
+        self.pending = {}            # (client, job) -> future
+        self.rendered = 0
+        self.cancelled = 0
+        self.lock = threading.Lock()
+
+    def schedule(self, filename, mode, size, queued=None, client=None):
+        """Queue renders of the images after filename, in the active mode and the original view
+
+        When the client is working through the review queue, queued holds the
+        queued filenames and only those are prefetched, in list order. client
+        identifies the browser tab; only its own stale renders are cancelled.
+        """
+        if self.depth <= 0:
+            return
+
+        # Originals at full size are served as-is, so there is nothing to render for them
+        modes = tuple(m for m in dict.fromkeys(('original', mode)) if m in RENDERED_MODES or size != 'full')
+        if not modes:
+            return
+
+        listing = get_raw_listing()
+        if queued is None:
+            upcoming, _ = listing.page(cursor=filename, limit=self.depth)
+        else:
+            listing.refresh()
+            after = sort_key(filename)
+            upcoming = heapq.nsmallest(self.depth, (name for name in queued
+                                                    if name in listing.members and sort_key(name) > after), key=sort_key)
+        jobs = [(listing.raw_dir, name, size, modes) for name in upcoming]
+
+        with self.lock:
+            self.wanted[client] = set(jobs)
+            self.wanted.move_to_end(client)
+            while len(self.wanted) > MAX_CLIENTS:
+                self.wanted.popitem(last=False)
+            stale = [future for (owner, job), future in self.pending.items()
+                     if owner not in self.wanted or (owner == client and job not in self.wanted[client])]
+            queued = {job for owner, job in self.pending if owner == client}
+
+        # Cancelling runs the future's done callbacks here, which take the lock
+        cancelled = sum(1 for future in stale if future.cancel())
+        with self.lock:
+            self.cancelled += cancelled
+
+        # Submitted nearest first; the pool works through them in order
+        for job in jobs:
+            if job not in queued:
+                self._submit(client, job)
+
+    def _submit(self, client, job):
+        raw_dir, name, size, modes = job
+        image_path = os.path.join(raw_dir, name)
+        try:
+            # Same key parameters as serve_image, so the request finds these renders
+            keys = {mode: self.cache.make_key(image_path, mode, size=size, quality=OUTPUT_QUALITY) for mode in modes}
+        except OSError:
+            return  # renamed or deleted since the listing was read
+        missing = {mode: key for mode, key in keys.items() if not self.cache.contains(key)}
+        if not missing:
+            return
+
+        future = self.transforms.submit_background(list(missing.values()),
+                                                   lambda: self._render(client, job, image_path, missing))
+        if future is None:
+            return  # already being rendered
+        with self.lock:
+            self.pending[(client, job)] = future
+        future.add_done_callback(lambda done: self._forget((client, job), done))
+
+    def _render(self, client, job, image_path, keys):
+        with self.lock:
+            if job not in self.wanted.get(client, ()):
+                self.cancelled += 1
+                return
+        try:
+            # One decode for every missing mode
+            for mode, data in self.render(image_path, list(keys), job[2], OUTPUT_QUALITY).items():
+                self.cache.put(keys[mode], data)
+            with self.lock:
+                self.rendered += len(keys)
+        except Exception as e:
+            print(f"Error prefetching {job[1]}: {e}")
+
+    def _forget(self, entry, future):
+        with self.lock:
+            if self.pending.get(entry) is future:
+                del self.pending[entry]
+
+    def stats(self):
+        """Return prefetch counters"""
+        with self.lock:
+            return {
+                'depth': self.depth,
+                'clients': len(self.wanted),
+                'queued': len(self.pending),
+                'rendered': self.rendered,
+                'cancelled': self.cancelled
+            }
+
+    def close(self):
+        """Drop renders that haven't started"""
+        with self.lock:
+            self.wanted.clear()
+            futures = list(self.pending.values())
+        for future in futures:
+            future.cancel()
@@ -3,36 +3,235 @@ Image processor module for VIN GUI application
 """
 import os
 import tempfile
-from PIL import Image, ImageEnhance, ImageOps
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from metrics import get_metrics
+
+# JPEG quality for rendered images
+OUTPUT_QUALITY = 85
+
+# Modes that need a decode and re-encode; anything else is served as the original
+RENDERED_MODES = ('bw', 'contrast', 'equalize', 'sharp', 'inverted')
+
+# Every view mode, in the order the UI offers them
+MODES = ('original',) + RENDERED_MODES
+
+# Longest side for each size class; None keeps the full resolution
+SIZE_CLASSES = {
+    'thumb': 320,
+    'screen': 1600,
+    'full': None
+}
+
+# Tile grid and clip limit for local histogram equalization
+EQUALIZE_TILES = 8
+EQUALIZE_CLIP_LIMIT = 2.0
+
+# Unsharp mask strength, and blur radius as a fraction of the shorter side
+SHARPEN_AMOUNT = 1.5
+SHARPEN_RADIUS = 1 / 400
+
+# ITU-R 601 luma weights, as used by Pillow's RGB to L conversion
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+def draft_to_fit(img, bounds):
+    """Let the JPEG decoder skip work by decoding at a reduced scale that still fills bounds"""
+    # Request the final size (in either orientation) rather than the bounding box,
+    # so EXIF rotation applied after decoding can't leave the image short
+    scale = min(bounds[0] / img.width, bounds[1] / img.height,
+                bounds[0] / img.height, bounds[1] / img.width)
+    if scale < 1:
+        img.draft(img.mode, (int(img.width * scale), int(img.height * scale)))
+
+def decode_image(image_path, max_side=None, roi=None):
+    """Decode an image once into an upright RGB array, optionally cropped and downscaled
+
+    roi is (x0, y0, x1, y1) as fractions of the image size; max_side bounds the
+    longest side of the result.
+    """
+    metrics = get_metrics()
+    with Image.open(image_path) as img:
+        with metrics.timer("decode"):
+            if max_side:
+                # Decode at reduced scale, enough for the cropped region to still fill max_side
+                fraction = min(roi[2] - roi[0], roi[3] - roi[1]) if roi else 1.0
+                needed = int(max_side / fraction)
+                draft_to_fit(img, (needed, needed))
+            img.load()
+            ImageOps.exif_transpose(img, in_place=True)
+
+        with metrics.timer("resize"):
+            if roi:
+                width, height = img.size
+                img = img.crop((int(roi[0] * width), int(roi[1] * height),
+                                int(roi[2] * width), int(roi[3] * height)))
+            if max_side:
+                img.thumbnail((max_side, max_side))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        return np.asarray(img)
+
+def to_grayscale(rgb):
+    """Luma of an RGB array as uint8"""
+    return (rgb @ LUMA_WEIGHTS + 0.5).astype(np.uint8)
+
+def stretch_contrast(gray, cutoff=1.0):
+    """Stretch levels so the darkest and brightest cutoff percent saturate"""
+    cdf = np.cumsum(np.bincount(gray.ravel(), minlength=256))
+    low = int(np.searchsorted(cdf, cdf[-1] * cutoff / 100))
+    high = int(np.searchsorted(cdf, cdf[-1] * (100 - cutoff) / 100))
+    if high <= low:
+        return gray
+    lut = np.clip((np.arange(256) - low) * 255.0 / (high - low), 0, 255).astype(np.uint8)
+    return lut[gray]
+
+def equalize_local(gray, tiles=EQUALIZE_TILES, clip_limit=EQUALIZE_CLIP_LIMIT):
+    """Contrast-limited adaptive histogram equalization (CLAHE)
+
+    Builds a clipped equalization curve per tile, then blends the four nearest
+    tile curves bilinearly for each pixel so tile seams don't show.
+    """
+    height, width = gray.shape
+    rows, cols = min(tiles, height), min(tiles, width)
+    row_edges = np.linspace(0, height, rows + 1).astype(int)
+    col_edges = np.linspace(0, width, cols + 1).astype(int)
+
+    # One histogram per tile, all in a single bincount
+    row_tile = np.repeat(np.arange(rows), np.diff(row_edges))
+    col_tile = np.repeat(np.arange(cols), np.diff(col_edges))
+    tile_ids = (row_tile[:, None] * cols + col_tile[None, :]) * 256 + gray
+    hist = np.bincount(tile_ids.ravel(), minlength=rows * cols * 256).reshape(rows * cols, 256).astype(np.float32)
+
+    # Clip each histogram and spread the excess evenly, which limits noise amplification
+    tile_pixels = hist.sum(axis=1, keepdims=True)
+    limit = np.maximum(clip_limit * tile_pixels / 256, 1)
+    excess = np.maximum(hist - limit, 0).sum(axis=1, keepdims=True)
+    hist = np.minimum(hist, limit) + excess / 256
+    curves = (np.cumsum(hist, axis=1) * 255 / tile_pixels).reshape(rows, cols, 256)
+
+    # Fractional tile coordinates of each row and column, relative to tile centres
+    row_pos = np.interp(np.arange(height), (row_edges[:-1] + row_edges[1:]) / 2, np.arange(rows))
+    col_pos = np.interp(np.arange(width), (col_edges[:-1] + col_edges[1:]) / 2, np.arange(cols))
+    top = np.floor(row_pos).astype(int)
+    left = np.floor(col_pos).astype(int)
+    bottom = np.minimum(top + 1, rows - 1)
+    right = np.minimum(left + 1, cols - 1)
+    row_weight = (row_pos - top).astype(np.float32)[:, None]
+    col_weight = (col_pos - left).astype(np.float32)[None, :]
+
+    top, bottom = top[:, None], bottom[:, None]
+    left, right = left[None, :], right[None, :]
+    upper = curves[top, left, gray] * (1 - col_weight) + curves[top, right, gray] * col_weight
+    lower = curves[bottom, left, gray] * (1 - col_weight) + curves[bottom, right, gray] * col_weight
+    return np.clip(upper * (1 - row_weight) + lower * row_weight + 0.5, 0, 255).astype(np.uint8)
+
+def _blur_rows(image, radius, passes):
+    """Box blur along the last axis using running sums, with edges extended"""
+    window = 2 * radius + 1
+    for _ in range(passes):
+        padded = np.pad(image, ((0, 0), (radius + 1, radius)), mode='edge')
+        sums = np.cumsum(padded, axis=1, dtype=np.float32)
+        image = (sums[:, window:] - sums[:, :-window]) / window
+    return image
+
+def box_blur(image, radius, passes=3):
+    """Separable box blur; three passes approximate a Gaussian"""
+    # Running sums along the last axis are several times faster than down columns,
+    # so blur the rows, transpose, and blur the rows again
+    blurred = _blur_rows(image.astype(np.float32), radius, passes)
+    blurred = _blur_rows(np.ascontiguousarray(blurred.T), radius, passes)
+    return blurred.T
+
+def unsharp_mask(gray, amount=SHARPEN_AMOUNT):
+    """Sharpen by adding back the difference from a blurred copy"""
+    radius = max(1, round(min(gray.shape) * SHARPEN_RADIUS))
+    sharpened = gray + amount * (gray - box_blur(gray, radius))
+    return np.clip(sharpened + 0.5, 0, 255).astype(np.uint8)
+
+def invert_high_contrast(gray):
+    """Double the contrast around the mean and invert, which helps with embossed text"""
+    mean = int(gray.mean() + 0.5)
+    return (255 - np.clip(2 * gray.astype(np.int16) - mean, 0, 255)).astype(np.uint8)
+
+def apply_modes(rgb, modes):
+    """Apply view modes to a decoded RGB array, sharing intermediate steps between them
+
+    Returns a dict of mode to uint8 array (RGB for 'original', grayscale otherwise).
+    """
+    steps = {}
+
+    def step(name, compute):
+        if name not in steps:
+            steps[name] = compute()
+        return steps[name]
+
+    def gray():
+        return step('gray', lambda: to_grayscale(rgb))
+
+    def stretched():
+        return step('contrast', lambda: stretch_contrast(gray()))
+
+    builders = {
+        'original': lambda: rgb,
+        'bw': gray,
+        'contrast': stretched,
+        'equalize': lambda: equalize_local(gray()),
+        'sharp': lambda: unsharp_mask(stretched()),
+        'inverted': lambda: invert_high_contrast(gray())
+    }
+    for mode in modes:
+        if mode not in builders:
+            raise ValueError(f"Unknown image mode: {mode}")
+    with get_metrics().timer("process"):
+        return {mode: builders[mode]() for mode in modes}
+
+def encode_jpeg(array, quality=OUTPUT_QUALITY):
+    """Encode a uint8 RGB or grayscale array as JPEG bytes"""
+    buffer = BytesIO()
+    with get_metrics().timer("encode"):
+        Image.fromarray(array).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+def render_modes(image_path, modes=MODES, size='full', quality=OUTPUT_QUALITY):
+    """Decode an image once and return {mode: JPEG bytes} for every requested mode"""
+    rgb = decode_image(image_path, SIZE_CLASSES.get(size))
+    return {mode: encode_jpeg(array, quality) for mode, array in apply_modes(rgb, modes).items()}
+
+def render_image(image_path, mode='original', size='full', quality=OUTPUT_QUALITY):
+    """Render image in the selected mode and size class and return the JPEG bytes"""
+    return render_modes(image_path, (mode,), size, quality)[mode]
+
+def decode_modes(image_path, modes, max_side=None, roi=None):
+    """Decode an image and return {mode: uint8 array} for every requested mode"""
+    return apply_modes(decode_image(image_path, max_side, roi), modes)
+
+def render_payload(image_path, max_side=None, roi=None, mode='original', max_bytes=None,
+                   quality=OUTPUT_QUALITY, min_quality=45):
+    """Render an image in one mode and JPEG-encode it within max_bytes
+
+    Quality steps down by 10 until the JPEG fits or reaches min_quality.
+    Returns (JPEG bytes, (width, height), quality used).
+    """
+    array = decode_modes(image_path, (mode,), max_side, roi)[mode]
+    while True:
+        data = encode_jpeg(array, quality)
+        if max_bytes is None or len(data) <= max_bytes or quality <= min_quality:
+            return data, (array.shape[1], array.shape[0]), quality
+        quality -= 10
 
 def process_image(image_path, mode='original'):
     """Process image based on selected mode"""
     try:
-        img = Image.open(image_path)
-
-        if mode == 'original':
-            output = img
-        elif mode == 'inverted':
-            # Create high contrast inverted image
-            # Convert to grayscale
-            output = img.convert('L')
-            
-            # Increase contrast
-            enhancer = ImageEnhance.Contrast(output)
-            output = enhancer.enhance(2.0)
-            
-            # Invert colors to help with embossed text
-            output = ImageOps.invert(output)
-        else:
-            output = img
-
         # Save to temporary file
         with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
             temp_path = tmp.name
-            output.save(temp_path, format='JPEG')
+            tmp.write(render_image(image_path, mode))
 
         return temp_path
 
     except Exception as e:
         print(f"Error processing image: {e}")
-        return image_path
\ No newline at end of file
+        return image_path
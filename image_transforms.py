@@ -0,0 +1,137 @@
+"""
+Bounded, coalescing executor for image renders in VIN GUI application
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError as FutureTimeout
+
+# Concurrent foreground renders, and how many may be queued or running before requests are turned away
+DEFAULT_RENDER_WORKERS = os.cpu_count() or 2
+DEFAULT_RENDER_QUEUE = DEFAULT_RENDER_WORKERS * 4
+
+# Seconds a request waits for its render before giving up
+DEFAULT_RENDER_TIMEOUT = 30
+
+# Seconds clients are told to wait before retrying when busy
+RETRY_AFTER = 1
+
+
+class TransformQueueFull(Exception):
+    """Raised when too many renders are already queued"""
+
+
+class TransformExecutor:
+    """Runs renders into the derived image cache on bounded thread pools
+
+    Identical renders in flight are coalesced: later callers wait on the first
+    caller's render instead of decoding the image again. Request renders go to
+    the foreground pool, which rejects new work once max_pending renders are
+    queued or running. Prefetch renders go to a separate background pool and
+    register their cache keys in the same in-flight table.
+    """
+
+    def __init__(self, cache, workers=DEFAULT_RENDER_WORKERS, max_pending=DEFAULT_RENDER_QUEUE,
+                 background_workers=2, timeout=DEFAULT_RENDER_TIMEOUT):
+        self.cache = cache
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.foreground = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="render")
+        self.background = ThreadPoolExecutor(max_workers=max(1, background_workers), thread_name_prefix="prefetch")
+        self.in_flight = {}    # cache key -> future producing it
+        self.pending = 0       # foreground renders queued or running
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        # Reentrant because cancelling a future runs its done callbacks on the cancelling thread
+        self.lock = threading.RLock()
+
+    def render(self, source_path, mode, render, **params):
+        """Return the cached path for render(source_path, mode, **params), rendering it at most once
+
+        Raises TransformQueueFull when the foreground pool is saturated and
+        TimeoutError when the render takes longer than the timeout.
+        """
+        key = self.cache.make_key(source_path, mode, **params)
+        while True:
+            path = self.cache.get(key)
+            if path:
+                return path
+
+            future = self._join_or_submit(key, lambda: self.cache.put(key, render(source_path, mode, **params)))
+            try:
+                path = future.result(self.timeout)
+            except CancelledError:
+                continue  # a prefetch we joined was dropped; render it ourselves
+            except FutureTimeout:
+                with self.lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"Render of {source_path} took longer than {self.timeout}s")
+            if not getattr(future, 'background', False):
+                # Use the path put returned: a rendition over the cache budget is gone on the next get
+                return path
+            # A joined prefetch may have skipped the image as stale; the next pass renders it
+
+    def submit_background(self, keys, work):
+        """Run work() on the background pool unless one of keys is already being rendered
+
+        Returns the future, or None if the work was skipped.
+        """
+        with self.lock:
+            if any(key in self.in_flight and not self.in_flight[key].done() for key in keys):
+                return None
+            future = self.background.submit(work)
+            future.background = True
+            self._register(keys, future)
+            return future
+
+    def _join_or_submit(self, key, work):
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None and not future.done():
+                # Don't wait behind the prefetch queue for a prefetch that hasn't started
+                if not (getattr(future, 'background', False) and future.cancel()):
+                    self.coalesced += 1
+                    return future
+
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise TransformQueueFull(f"{self.pending} renders already pending")
+            self.pending += 1
+            future = self.foreground.submit(work)
+            future.add_done_callback(self._foreground_done)
+            self._register([key], future)
+            return future
+
+    def _register(self, keys, future):
+        """Record future as producing keys until it finishes (lock must be held)"""
+        for key in keys:
+            self.in_flight[key] = future
+
+        def _release(done):
+            with self.lock:
+                for key in keys:
+                    if self.in_flight.get(key) is done:
+                        del self.in_flight[key]
+
+        future.add_done_callback(_release)
+
+    def _foreground_done(self, future):
+        with self.lock:
+            self.pending -= 1
+
+    def stats(self):
+        """Return executor counters"""
+        with self.lock:
+            return {
+                'pending': self.pending,
+                'max_pending': self.max_pending,
+                'in_flight': len(self.in_flight),
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts
+            }
+
+    def close(self):
+        """Drop queued renders and wait for running ones to finish writing"""
+        self.background.shutdown(wait=True, cancel_futures=True)
+        self.foreground.shutdown(wait=True, cancel_futures=True)
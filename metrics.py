@@ -0,0 +1,232 @@
+"""
+Latency histograms and counters for VIN GUI application and VIN OCR Processor
+"""
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds, from cache hits to full-size renders and sheet downloads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Seconds between snapshots written for other worker processes to merge
+FLUSH_SECONDS = 5
+
+# Help text for the exported metrics
+HELP = {
+    "vin_request_seconds": "Time to handle a request, by endpoint",
+    "vin_requests_total": "Requests handled, by endpoint and status code",
+    "vin_stage_seconds": "Time spent in each processing stage",
+    "vin_stage_errors_total": "Stage runs that raised an exception",
+    "vin_cache_lookups_total": "Rendered image cache lookups, by result",
+    "vin_sheet_fetches_total": "VIN sheet revalidations, by outcome"
+}
+
+# Per-thread stage durations collected by trace()
+_local = threading.local()
+
+
+@contextmanager
+def trace():
+    """Collect {stage: seconds} for every stage timed on this thread inside the block"""
+    outer = getattr(_local, "stages", None)
+    stages = _local.stages = {}
+    try:
+        yield stages
+    finally:
+        _local.stages = outer
+        if outer is not None:
+            for stage, seconds in stages.items():
+                outer[stage] = outer.get(stage, 0.0) + seconds
+
+
+class MetricsRegistry:
+    """Thread-safe counters and fixed-bucket histograms, cheap enough to record on every request
+
+    Each series is keyed by metric name and a sorted tuple of label pairs.
+    Histograms keep one count per bucket plus an overflow count and the sum.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [count per bucket..., overflow count, sum]
+        self.changes = 0
+        self.flushed = 0
+        self.flusher = None
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        """Add amount to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            self.changes += 1
+
+    def observe(self, name, seconds, **labels):
+        """Record a duration in a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += seconds
+            self.changes += 1
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the enclosed block as a stage, counting it as an error if it raises
+
+        The duration is also added to the calling thread's trace(), if one is open.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("vin_stage_errors_total", stage=stage)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("vin_stage_seconds", elapsed, stage=stage)
+            stages = getattr(_local, "stages", None)
+            if stages is not None:
+                stages[stage] = stages.get(stage, 0.0) + elapsed
+
+    def record_stages(self, stages):
+        """Record {stage: seconds} timed elsewhere, such as in a worker process, as if timed here"""
+        trace_stages = getattr(_local, "stages", None)
+        for stage, seconds in stages.items():
+            self.observe("vin_stage_seconds", seconds, stage=stage)
+            if trace_stages is not None:
+                trace_stages[stage] = trace_stages.get(stage, 0.0) + seconds
+
+    def snapshot(self):
+        """Return the current values as JSON-serializable data"""
+        with self.lock:
+            return {
+                "buckets": list(self.buckets),
+                "counters": [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, dict(labels), list(series)] for (name, labels), series in self.histograms.items()]
+            }
+
+    def flush(self, directory):
+        """Write a snapshot to directory for other worker processes, if anything changed since the last one"""
+        with self.lock:
+            changes = self.changes
+        if changes == self.flushed:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+        self.flushed = changes
+
+    def start_flushing(self, directory, interval=FLUSH_SECONDS):
+        """Flush a snapshot to directory every interval seconds on a background thread"""
+        def _run():
+            while not self.stopping.wait(interval):
+                try:
+                    self.flush(directory)
+                except OSError as e:
+                    print(f"Error writing metrics: {e}")
+
+        self.flusher = threading.Thread(target=_run, name="metrics-flush", daemon=True)
+        self.flusher.start()
+
+    def close(self, directory):
+        """Stop flushing and remove this process's snapshot, so it isn't merged after exit"""
+        self.stopping.set()
+        try:
+            os.remove(os.path.join(directory, f"{os.getpid()}.json"))
+        except OSError:
+            pass
+
+
+def _is_running(pid):
+    """Check whether a process exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect(directory):
+    """Merge this process's metrics with the latest snapshots of the other live worker processes"""
+    snapshots = [registry.snapshot()]
+    # Only forked workers share a directory; os.kill(pid, 0) is not a probe on Windows
+    if hasattr(os, "fork") and os.path.isdir(directory):
+        for entry in os.scandir(directory):
+            name, ext = os.path.splitext(entry.name)
+            if ext != ".json" or not name.isdigit() or int(name) == os.getpid() or not _is_running(int(name)):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # the worker is replacing it
+
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        if snapshot["buckets"] != list(registry.buckets):
+            continue
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, series in snapshot["histograms"]:
+            key = (name, tuple(sorted(labels.items())))
+            merged = histograms.setdefault(key, [0] * len(series))
+            histograms[key] = [a + b for a, b in zip(merged, series)]
+    return counters, histograms
+
+
+def _format_labels(labels, extra=()):
+    """Render label pairs as {a="1",b="2"}, escaped for the text format"""
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus(counters, histograms, buckets=DEFAULT_BUCKETS):
+    """Render merged metrics in the Prometheus text exposition format"""
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for (series_name, labels), value in sorted(counters.items()):
+            if series_name == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (series_name, labels), series in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], series[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {series[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# Metrics for this process
+registry = MetricsRegistry()
+
+def get_metrics():
+    """Get the metrics registry for this process"""
+    return registry
@@ -0,0 +1,229 @@
+"""
+Vision model backend client for VIN OCR Processor
+"""
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+
+class BackendUnavailable(Exception):
+    """Raised when the backend has been down for longer than the client will wait."""
+
+
+class OllamaClient:
+    """Pooled, keep-alive client for the Ollama API with retries and a circuit breaker.
+
+    Retries 5xx responses, timeouts and connection errors with exponential
+    backoff and full jitter. After `failure_threshold` consecutive failed calls
+    the circuit opens and every caller pauses for `cooldown` seconds. Then one
+    caller makes a trial call while the rest keep waiting; the circuit closes
+    when it succeeds and reopens when it fails. Failures that open the circuit,
+    and time spent waiting on it, don't use up a caller's retries, so a dead
+    backend stalls the run instead of failing every image. Once the backend has
+    been down for `max_outage` seconds, calls raise BackendUnavailable.
+    """
+
+    def __init__(self, base_url, model, keep_alive="30m", timeout=120, connect_timeout=10,
+                 max_retries=3, backoff_base=1.0, backoff_max=30.0, pool_size=8,
+                 failure_threshold=5, cooldown=60, max_outage=None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_outage = max_outage
+
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self.lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened_at = None       # when the circuit last opened; None while closed
+        self.outage_started = None  # when it first opened since the last successful call
+        self.trial_running = False  # a half-open trial call is in flight
+        self.timings = []
+        self.failed_calls = 0
+        self.retries = 0
+        self.circuit_opens = 0
+
+    def generate(self, prompt, images=None):
+        """Run a non-streaming generate call and return the response JSON, or None on a client error.
+
+        Raises BackendUnavailable once the backend has been down for max_outage seconds.
+        """
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": self.keep_alive
+        }
+        if images:
+            payload["images"] = images
+
+        attempt = 0
+        while True:
+            trial = self._wait_for_circuit()
+            connections_before = self._connection_count()
+            start = time.perf_counter()
+            try:
+                response = self.session.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if self._record_failure(trial):
+                    continue  # the circuit is open: wait it out, then try this image again
+                if attempt == self.max_retries:
+                    raise
+                self._backoff(attempt, f"{type(e).__name__}: {e}")
+                attempt += 1
+                continue
+            except BaseException:
+                self._end_trial(trial)
+                raise
+
+            round_trip = time.perf_counter() - start
+            if response.status_code >= 500:
+                if self._record_failure(trial):
+                    continue
+                if attempt == self.max_retries:
+                    logger.error(f"API Error: {response.status_code} - {response.text}")
+                    return None
+                self._backoff(attempt, f"HTTP {response.status_code}")
+                attempt += 1
+                continue
+
+            self._record_success()
+            if response.status_code != 200:
+                with self.lock:
+                    self.failed_calls += 1
+                logger.error(f"API Error: {response.status_code} - {response.text}")
+                return None
+
+            response_json = response.json()
+            self._record_timing(response_json, round_trip, self._connection_count() > connections_before)
+            return response_json
+
+    def warm_up(self):
+        """Load the model and keep it resident for keep_alive, without generating anything."""
+        response = self.session.post(
+            f"{self.base_url}/api/generate",
+            json={"model": self.model, "keep_alive": self.keep_alive},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json().get("load_duration", 0) / 1e9
+
+    def version(self):
+        """Return the Ollama server version."""
+        response = self.session.get(f"{self.base_url}/api/version", timeout=5)
+        return response.json().get("version", "unknown")
+
+    def list_models(self):
+        """Return the names of models available on the server."""
+        response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
+        return [m.get("name") for m in response.json().get("models", [])]
+
+    def stats(self):
+        """Summarize per-call timings in seconds (p50/p95), plus retry and circuit breaker counts."""
+        with self.lock:
+            timings = list(self.timings)
+        summary = {
+            "calls": len(timings),
+            "failed_calls": self.failed_calls,
+            "new_connections": sum(1 for t in timings if t["new_connection"]),
+            "retries": self.retries,
+            "circuit_opens": self.circuit_opens
+        }
+        for key in ("round_trip", "overhead", "load", "inference"):
+            values = sorted(t[key] for t in timings)
+            if values:
+                summary[key] = {
+                    "p50": values[len(values) // 2],
+                    "p95": values[min(len(values) - 1, int(len(values) * 0.95))]
+                }
+        return summary
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+    def _connection_count(self):
+        """Number of connections the pool has opened so far."""
+        pool = self.adapter.poolmanager.connection_from_url(self.base_url)
+        return pool.num_connections
+
+    def _record_timing(self, response_json, round_trip, new_connection):
+        # Ollama reports its own durations in nanoseconds; anything beyond them is network, TLS and queueing
+        server_total = response_json.get("total_duration", 0) / 1e9
+        timing = {
+            "round_trip": round_trip,
+            "overhead": max(0.0, round_trip - server_total),
+            "load": response_json.get("load_duration", 0) / 1e9,
+            "inference": server_total,
+            "new_connection": new_connection
+        }
+        with self.lock:
+            self.timings.append(timing)
+        logger.debug(f"Backend timing: round trip {round_trip:.2f}s, inference {server_total:.2f}s, "
+                     f"load {timing['load']:.2f}s, overhead {timing['overhead']:.2f}s"
+                     f"{', new connection' if new_connection else ''}")
+
+    def _backoff(self, attempt, reason):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        with self.lock:
+            self.retries += 1
+        logger.warning(f"Backend call failed ({reason}); retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+    def _record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.outage_started = None
+            self.trial_running = False
+
+    def _record_failure(self, trial=False):
+        """Count a failed call; returns True if the circuit is open, so the caller should wait instead of retrying."""
+        with self.lock:
+            self.failed_calls += 1
+            self.consecutive_failures += 1
+            if trial:
+                # The backend is still down: pause again
+                self.trial_running = False
+                self.opened_at = time.monotonic()
+                self.circuit_opens += 1
+                logger.error(f"Backend trial call failed; pausing for another {self.cooldown}s")
+            elif self.opened_at is None and self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = self.outage_started = time.monotonic()
+                self.circuit_opens += 1
+                logger.error(f"Backend failed {self.consecutive_failures} times in a row; pausing for {self.cooldown}s")
+            return self.opened_at is not None
+
+    def _end_trial(self, trial):
+        """Let another caller make the trial call after this one ended without an answer."""
+        if trial:
+            with self.lock:
+                self.trial_running = False
+
+    def _wait_for_circuit(self):
+        """Block while the circuit is open; returns True if the caller is to make the half-open trial call."""
+        while True:
+            with self.lock:
+                if self.opened_at is None:
+                    return False
+                now = time.monotonic()
+                if self.max_outage and now - self.outage_started >= self.max_outage:
+                    raise BackendUnavailable(f"Backend has been failing for {now - self.outage_started:.0f}s")
+                remaining = self.opened_at + self.cooldown - now
+                if remaining <= 0 and not self.trial_running:
+                    self.trial_running = True
+                    return True
+            time.sleep(min(max(remaining, 0.05), 1.0))
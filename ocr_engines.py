@@ -0,0 +1,219 @@
+"""
+OCR engines and the engine cascade for VIN OCR Processor
+"""
+import re
+import time
+import threading
+from collections import namedtuple
+
+from loguru import logger
+from PIL import Image
+
+from image_processor import decode_modes
+from image_pool import get_image_pool
+from metrics import get_metrics
+from ocr_backend import BackendUnavailable
+
+try:
+    import pytesseract
+except ImportError:  # Tesseract is optional
+    pytesseract = None
+
+# Result of a single engine run; confidence is in [0, 1]. guess is set by the cascade when no
+# engine produced a VIN: the most confident answer an earlier engine gave, for a person to check.
+EngineResult = namedtuple("EngineResult", ["vin", "confidence", "raw_response", "payload_bytes", "guess"],
+                          defaults=(None,))
+
+# VINs never use I, O or Q
+VIN_ALPHABET = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+VIN_CHARS = "A-HJ-NPR-Z0-9"
+FULL_VIN_PATTERN = re.compile(rf"[{VIN_CHARS}]{{17}}")
+VIN_SUFFIX_PATTERN = re.compile(rf"^[{VIN_CHARS}]{{6}}$")
+VIN_SUFFIX_SEARCH = re.compile(rf"(?<![{VIN_CHARS}])[{VIN_CHARS}]{{6}}(?![{VIN_CHARS}])")
+
+
+def is_valid_vin_suffix(vin):
+    """Check that a value looks like the last 6 characters of a VIN."""
+    return bool(vin) and bool(VIN_SUFFIX_PATTERN.match(vin.upper()))
+
+
+class OCREngine:
+    """Base class for OCR engines; subclasses implement recognize()."""
+
+    name = "engine"
+
+    def available(self):
+        """Whether the engine can run in this environment."""
+        return True
+
+    def recognize(self, image_path):
+        """Return an EngineResult for the image."""
+        raise NotImplementedError
+
+
+class TesseractEngine(OCREngine):
+    """Fast in-process first pass using Tesseract on a downscaled, contrast-stretched image."""
+
+    name = "tesseract"
+
+    def __init__(self, max_side=1600):
+        self.max_side = max_side
+        self.config = f"--psm 6 -c tessedit_char_whitelist={VIN_ALPHABET}"
+
+    def available(self):
+        if pytesseract is None:
+            return False
+        try:
+            pytesseract.get_tesseract_version()
+            return True
+        except Exception:
+            return False
+
+    def recognize(self, image_path):
+        gray = Image.fromarray(get_image_pool().run(decode_modes, image_path, ("contrast",), self.max_side)["contrast"])
+
+        with get_metrics().timer("tesseract"):
+            data = pytesseract.image_to_data(gray, config=self.config, output_type=pytesseract.Output.DICT)
+        words = [(text.strip().upper(), float(conf)) for text, conf in zip(data["text"], data["conf"])
+                 if text.strip() and float(conf) >= 0]
+        raw_response = " ".join(text for text, _ in words)
+
+        # A full 17-character VIN is the strongest signal; fall back to a standalone 6-character token
+        for text, conf in words:
+            match = FULL_VIN_PATTERN.search(text)
+            if match:
+                return EngineResult(match.group(0)[-6:], conf / 100, raw_response, 0)
+        for text, conf in words:
+            match = VIN_SUFFIX_SEARCH.search(text)
+            if match:
+                # A bare 6-character token could be anything stamped on the part
+                return EngineResult(match.group(0), conf / 100 * 0.8, raw_response, 0)
+        return EngineResult(None, 0.0, raw_response, 0)
+
+
+class VisionModelEngine(OCREngine):
+    """The remote vision model, wrapping a recognize(image_path) -> (vin, raw_response, payload_bytes) callable."""
+
+    name = "vision"
+
+    def __init__(self, recognize):
+        self._recognize = recognize
+
+    def recognize(self, image_path):
+        vin, raw_response, payload_bytes = self._recognize(image_path)
+        # The model was told to answer with the 6 characters only; anything chattier is less certain
+        exact = raw_response is not None and is_valid_vin_suffix(raw_response.strip())
+        confidence = 0.0 if not vin else (0.95 if exact else 0.6)
+        return EngineResult(vin.upper() if vin else None, confidence, raw_response, payload_bytes)
+
+
+class EngineCascade:
+    """Runs engines cheapest first and escalates until one passes the confidence and format checks.
+
+    If known_vins is given, a result must also be one of those VINs to be accepted,
+    and it is used to score each engine's accuracy.
+    """
+
+    def __init__(self, engines, min_confidence=0.8, known_vins=None):
+        self.engines = engines
+        self.min_confidence = min_confidence
+        self.known_vins = set(known_vins) if known_vins else None
+        self.lock = threading.Lock()
+        self.stats = {engine.name: {"used": 0, "accepted": 0, "checked": 0, "correct": 0, "times": []}
+                      for engine in engines}
+
+    def accepts(self, result):
+        """Whether a result is good enough to stop escalating."""
+        if not is_valid_vin_suffix(result.vin) or result.confidence < self.min_confidence:
+            return False
+        return self.known_vins is None or result.vin in self.known_vins
+
+    def recognize(self, image_path):
+        """Return (EngineResult, engine name) from the first engine whose result is accepted.
+
+        The last engine's answer is returned even if it fails the checks, as before
+        the cascade existed.
+        """
+        attempts = []
+        for index, engine in enumerate(self.engines):
+            start = time.perf_counter()
+            try:
+                result = engine.recognize(image_path)
+            except BackendUnavailable:
+                raise
+            except Exception as e:
+                logger.error(f"{engine.name} failed on {image_path}: {e}")
+                result = EngineResult(None, 0.0, None, 0)
+            elapsed = time.perf_counter() - start
+
+            accepted = self.accepts(result)
+            attempts.append((engine.name, result))
+            with self.lock:
+                stats = self.stats[engine.name]
+                stats["used"] += 1
+                stats["times"].append(elapsed)
+                if accepted:
+                    stats["accepted"] += 1
+
+            if accepted or index == len(self.engines) - 1:
+                self._score(attempts, result.vin if accepted else None)
+                if not accepted and index > 0:
+                    logger.info(f"No engine passed the checks; using {engine.name} result {result.vin}")
+                if not result.vin:
+                    answers = [attempt for _, attempt in attempts if attempt.vin]
+                    if answers:
+                        result = result._replace(guess=max(answers, key=lambda attempt: attempt.confidence).vin)
+                return result, engine.name
+
+            logger.info(f"{engine.name} result {result.vin!r} (confidence {result.confidence:.2f}) "
+                        f"did not pass; escalating")
+
+    def _score(self, attempts, final_vin):
+        """Score each engine's answer against the known VINs, or else against the answer a later engine accepted."""
+        with self.lock:
+            for position, (name, result) in enumerate(attempts):
+                if not result.vin:
+                    continue
+                if self.known_vins is not None:
+                    truth = result.vin in self.known_vins
+                elif final_vin and position < len(attempts) - 1:
+                    truth = result.vin == final_vin
+                else:
+                    continue
+                self.stats[name]["checked"] += 1
+                self.stats[name]["correct"] += int(truth)
+
+    def report(self):
+        """Per-engine usage, acceptance, accuracy and latency."""
+        with self.lock:
+            report = {}
+            for name, stats in self.stats.items():
+                times = sorted(stats["times"])
+                report[name] = {
+                    "used": stats["used"],
+                    "accepted": stats["accepted"],
+                    "accuracy": stats["correct"] / stats["checked"] if stats["checked"] else None,
+                    "mean_seconds": sum(times) / len(times) if times else None,
+                    "p95_seconds": times[min(len(times) - 1, int(len(times) * 0.95))] if times else None
+                }
+            return report
+
+
+def build_cascade(names, recognize_with_model, min_confidence=0.8, known_vins=None):
+    """Build a cascade from engine names, skipping engines that can't run here."""
+    factories = {
+        "tesseract": TesseractEngine,
+        "vision": lambda: VisionModelEngine(recognize_with_model)
+    }
+    engines = []
+    for name in names:
+        if name not in factories:
+            raise ValueError(f"Unknown OCR engine: {name} (choose from {', '.join(factories)})")
+        engine = factories[name]()
+        if engine.available():
+            engines.append(engine)
+        else:
+            logger.warning(f"OCR engine {name} is not available and will be skipped")
+    if not engines:
+        raise ValueError("No OCR engines available")
+    return EngineCascade(engines, min_confidence=min_confidence, known_vins=known_vins)
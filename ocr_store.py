@@ -0,0 +1,64 @@
+"""
+OCR result store for VIN OCR Processor, keyed by image content hash
+"""
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    content_hash TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    vin TEXT,
+    raw_response TEXT,
+    backend TEXT,
+    latency REAL,
+    created_at TEXT NOT NULL
+)
+"""
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRResultStore:
+    """SQLite store of OCR results; an image counts as resolved once it has a VIN."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(SCHEMA)
+
+    def get_resolved(self, content_hash):
+        """Return the stored result for content_hash if it has a VIN, else None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM results WHERE content_hash = ? AND vin IS NOT NULL", (content_hash,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record(self, content_hash, filename, vin, raw_response, backend, latency):
+        """Insert or replace the result for content_hash."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(content_hash, filename, vin, raw_response, backend, latency, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (content_hash, filename, vin, raw_response, backend, latency, datetime.now().isoformat())
+            )
+
+    def close(self):
+        """Close the database connection."""
+        with self.lock:
+            self.conn.close()
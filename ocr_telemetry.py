@@ -0,0 +1,144 @@
+"""
+Per-image OCR telemetry records and run reports for VIN OCR Processor
+"""
+import json
+import queue
+import threading
+from collections import defaultdict
+
+from loguru import logger
+
+# Stages reported, in pipeline order; anything else recorded is listed after them
+STAGE_ORDER = ("decode", "resize", "process", "encode", "tesseract", "network", "parse", "copy", "store")
+
+# Outcomes of images that went through OCR this run (resumed ones were answered by the results database)
+OCR_OUTCOMES = ("recognized", "manual", "queued", "skipped", "copy_failed", "error")
+
+
+class TelemetrySink:
+    """Appends records to a JSONL file from a background thread, so callers never wait on the disk"""
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.SimpleQueue()
+        self.file = open(path, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self.thread.start()
+
+    def emit(self, record):
+        """Queue a record for writing"""
+        self.queue.put(record)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            try:
+                self.file.write(json.dumps(record) + "\n")
+                # Flush once the backlog is written, not per record
+                if self.queue.empty():
+                    self.file.flush()
+            except (OSError, TypeError, ValueError) as e:
+                logger.error(f"Error writing telemetry: {e}")
+        self.file.close()
+
+    def close(self):
+        """Write everything queued so far and close the file"""
+        self.queue.put(None)
+        self.thread.join()
+
+
+def load_records(path):
+    """Read telemetry records, skipping lines cut short by an interrupted run"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize_runs(records):
+    """Per-run throughput and outcome counts, oldest run first"""
+    runs = defaultdict(list)
+    for record in records:
+        runs[record.get("run")].append(record)
+
+    summaries = []
+    for run, run_records in runs.items():
+        started = min(r["started"] for r in run_records)
+        finished = max(r["finished"] for r in run_records)
+        outcomes = defaultdict(int)
+        for record in run_records:
+            outcomes[record["outcome"]] += 1
+        payloads = [r["payload_bytes"] for r in run_records if r.get("payload_bytes")]
+        attempted = sum(outcomes.get(o, 0) for o in OCR_OUTCOMES)
+        wall = finished - started
+        summaries.append({
+            "run": run,
+            "started": started,
+            "images": len(run_records),
+            "wall_seconds": wall,
+            "images_per_minute": len(run_records) / wall * 60 if wall > 0 else None,
+            # Share of images OCR answered without help; manual entries count as misses
+            "success_rate": outcomes.get("recognized", 0) / attempted if attempted else None,
+            "outcomes": dict(outcomes),
+            "mean_payload_bytes": sum(payloads) / len(payloads) if payloads else None
+        })
+    summaries.sort(key=lambda summary: summary["started"])
+    return summaries
+
+
+def summarize_stages(records):
+    """Latency distribution per stage, plus the whole image, over images that ran OCR"""
+    durations = defaultdict(list)
+    for record in records:
+        if record["outcome"] == "resumed":
+            continue  # nothing ran; including them would flatten the tail
+        durations["total"].append(record["seconds"])
+        for stage, seconds in record.get("stages", {}).items():
+            durations[stage].append(seconds)
+
+    order = {stage: index for index, stage in enumerate(STAGE_ORDER)}
+    order["total"] = len(STAGE_ORDER) + 1
+    summary = []
+    for stage in sorted(durations, key=lambda stage: (order.get(stage, len(STAGE_ORDER)), stage)):
+        values = sorted(durations[stage])
+        summary.append({
+            "stage": stage,
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": values[-1]
+        })
+    return summary
+
+
+def summarize_backends(records):
+    """Success rate and latency per backend that produced the result"""
+    by_backend = defaultdict(list)
+    for record in records:
+        if record["outcome"] != "resumed" and record.get("backend"):
+            by_backend[record["backend"]].append(record)
+
+    summary = []
+    for backend, backend_records in sorted(by_backend.items()):
+        values = sorted(r["seconds"] for r in backend_records)
+        summary.append({
+            "backend": backend,
+            "images": len(backend_records),
+            "success_rate": sum(1 for r in backend_records if r["outcome"] == "recognized") / len(backend_records),
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95)
+        })
+    return summary
@@ -0,0 +1,117 @@
+"""
+Opt-in cProfile capture for VIN GUI requests and VIN OCR images
+"""
+import os
+import re
+import io
+import time
+import uuid
+import pstats
+import random
+import cProfile
+import threading
+
+# Profiles kept on disk; older ones are deleted as new ones are written
+DEFAULT_PROFILE_KEEP = 50
+
+PROFILE_SUFFIX = ".prof"
+
+# Characters allowed in the label part of a profile name
+UNSAFE_LABEL_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class Profiler:
+    """Profiles a sampled fraction of calls with cProfile and keeps the newest profiles on disk
+
+    One call is profiled at a time: cProfile only sees the thread that started
+    it, and profiling several threads at once would slow the process down
+    enough to distort what is measured. A sampled call that arrives while
+    another is being profiled just runs normally.
+    """
+
+    def __init__(self, directory, rate=0.0, keep=DEFAULT_PROFILE_KEEP):
+        self.directory = directory
+        self.rate = rate
+        self.keep = keep
+        self.active = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self, force=False):
+        """Start profiling the calling thread if this call is sampled (or forced); returns the profile or None"""
+        if not force and (self.rate <= 0 or random.random() >= self.rate):
+            return None
+        if not self.active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.started = time.perf_counter()
+        profile.enable()
+        return profile
+
+    def stop(self, profile, label):
+        """Stop a profile from start() and save it; returns the profile name, or None if it couldn't be saved"""
+        profile.disable()
+        elapsed = time.perf_counter() - profile.started
+        self.active.release()
+        try:
+            return self._save(profile, label, elapsed)
+        except OSError as e:
+            print(f"Error saving profile: {e}")
+            return None
+
+    def run(self, label, func, *args, force=False, **kwargs):
+        """Call func(*args, **kwargs), profiling it if sampled"""
+        profile = self.start(force)
+        if profile is None:
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.stop(profile, label)
+
+    def _save(self, profile, label, elapsed):
+        """Write the profile under a sortable, self-describing name and drop the oldest beyond keep"""
+        slug = UNSAFE_LABEL_CHARS.sub("_", label).strip("_")[:60] or "call"
+        name = (f"{time.strftime('%Y%m%d-%H%M%S')}-{elapsed * 1000:.0f}ms-{slug}-"
+                f"{os.getpid()}-{uuid.uuid4().hex[:6]}{PROFILE_SUFFIX}")
+        path = os.path.join(self.directory, name)
+        profile.dump_stats(f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        self._rotate()
+        return name
+
+    def _rotate(self):
+        """Delete the oldest profiles beyond keep"""
+        for entry in self.list()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.directory, entry['name']))
+            except OSError:
+                pass  # another worker process removed it first
+
+    def list(self):
+        """Return saved profiles, newest first"""
+        entries = []
+        with os.scandir(self.directory) as found:
+            for entry in found:
+                if not entry.name.endswith(PROFILE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append({'name': entry.name, 'bytes': stat.st_size, 'created': stat.st_mtime})
+        entries.sort(key=lambda entry: entry['created'], reverse=True)
+        return entries
+
+    def path_for(self, name):
+        """Return the path of a saved profile, or None if name isn't one"""
+        if os.path.basename(name) != name or not name.endswith(PROFILE_SUFFIX):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def summary(self, name, sort="cumulative", limit=40):
+        """Return a saved profile as pstats text, the top entries by sort"""
+        out = io.StringIO()
+        stats = pstats.Stats(self.path_for(name), stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
@@ -0,0 +1,121 @@
+"""
+Review queue of images VIN OCR Processor couldn't read, worked through in VIN GUI application
+"""
+import os
+import json
+import uuid
+import hashlib
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Queues live in this subdirectory of the web app's cache directory, one per raw image directory.
+# Writing one never touches the raw directory, whose mtime drives the image listing's rescans.
+REVIEW_QUEUE_DIR = "review_queues"
+
+# Characters of the raw model response kept with an entry
+RAW_RESPONSE_CHARS = 500
+
+
+def default_queue_path(raw_dir, cache_dir):
+    """Return the review queue path for a raw image directory, so the OCR runner and the web app find the same one"""
+    digest = hashlib.sha1(os.path.abspath(raw_dir).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, REVIEW_QUEUE_DIR, f"{digest}.json")
+
+
+class ReviewQueue:
+    """Images waiting for someone to read their VIN, keyed by filename in the raw directory
+
+    The queue is a small JSON file shared by the OCR runner, which adds the
+    images it couldn't read, and every web app worker process, which removes
+    them as they are saved or deleted. Each change rewrites the file under an
+    exclusive lock; readers reparse it only when its size or mtime moved.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.lock = threading.Lock()
+        self.signature = None
+        self.cached = {}
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the in-process and cross-process write locks"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        """Read the queue from disk; a missing or unreadable file is an empty queue"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self, entries):
+        """Replace the queue file (write lock must be held)"""
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def entries(self):
+        """Return {filename: entry} for every queued image"""
+        signature = self._stat()
+        with self.lock:
+            if signature != self.signature:
+                self.cached = self._load() if signature else {}
+                self.signature = signature
+            return self.cached
+
+    def version(self):
+        """Token that changes whenever the queue file does"""
+        signature = self._stat()
+        return f"{signature[0]:x}-{signature[1]:x}" if signature else "0"
+
+    def add(self, filename, guess=None, reason="no_vin", backend=None, raw_response=None, run=None):
+        """Queue an image for review, replacing any earlier entry for it"""
+        with self._exclusive():
+            entries = self._load()
+            entries[filename] = {
+                "image": filename,
+                "guess": guess,
+                "reason": reason,
+                "backend": backend,
+                "raw_response": raw_response[:RAW_RESPONSE_CHARS] if raw_response else None,
+                "run": run,
+                "queued_at": datetime.now().isoformat(timespec="seconds")
+            }
+            self._save(entries)
+
+    def remove(self, filename):
+        """Take an image off the queue; returns whether it was queued"""
+        if filename not in self.entries():
+            return False
+        with self._exclusive():
+            entries = self._load()
+            if entries.pop(filename, None) is None:
+                return False
+            self._save(entries)
+            return True
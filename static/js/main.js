@@ -16,26 +16,66 @@ document.addEventListener('DOMContentLoaded', function() {
     const statsMatched = document.getElementById('stats-matched');
     const statsPending = document.getElementById('stats-pending');
     const vinList = document.getElementById('vin-list');
+    const reviewToggle = document.getElementById('review-toggle');
+    const reviewOnlyInput = document.getElementById('review-only');
+    const reviewCountEl = document.getElementById('review-count');
     const shortcutButtons = document.querySelectorAll('.shortcut-button');
 
+    // Images fetched per request; the first page is on screen while the rest load
+    const IMAGE_PAGE_SIZE = 500;
+
+    // Fixed row heights in pixels, which let the lists place rows without measuring them
+    const IMAGE_ROW_HEIGHT = 45;
+    const VIN_ROW_HEIGHT = 37;
+
     // State
-    let images = [];
+    let allImages = [];     // every image, in the server's order
+    let images = [];        // the work list: allImages, or only those on the OCR review queue
+    let imageRecords = {};  // filename -> {name, vin, processed, sort_key, version, review?} from the server
+    let reviewOnly = false;
+    let reviewChosen = false;  // the operator picked the list themselves; don't switch it for them
     let currentIndex = 0;
     let processedCount = 0;
     let vinData = { vins: [], matched: [], pending: [] };
     let currentImageMode = 'original';
+    let changeStream = null;
+    let changeCursor = null;  // id of the last change applied from the stream
+    const clientId = Math.random().toString(36).slice(2, 10);  // this tab, so its prefetches don't cancel another's
+    let loadGeneration = 0;   // bumped by each loadData, so pages of an older load are dropped
+    let loadingMore = false;  // pages of the listing are still arriving
+    let removedNames = new Set();  // renamed or deleted since the load began; later pages may still list them
+
+    // Only the rows in view exist in the DOM
+    const imageListView = new VirtualList(imageList, IMAGE_ROW_HEIGHT, describeImageRow, selectImage);
+    const vinListView = new VirtualList(vinList, VIN_ROW_HEIGHT, describeVinRow);
+    imageListView.showMessage('<div class="p-4 text-ibm-gray-60 italic">Loading images...</div>');
+    vinListView.showMessage('<div class="p-4 text-ibm-gray-60 italic">Loading VINs...</div>');
 
     // Load images and VIN data
     async function loadData() {
+        const generation = ++loadGeneration;
         try {
             statusEl.textContent = 'Loading data...';
 
-            // Load images
-            const imagesResponse = await fetch('/api/images');
+            // Load the first page of images; the rest follow once it is on screen
+            const imagesResponse = await fetch(`/api/images?limit=${IMAGE_PAGE_SIZE}`);
             const imagesData = await imagesResponse.json();
 
-            images = imagesData.images;
+            // Records arrive in list order with the VIN and processed flag already worked out
+            allImages = [];
+            imageRecords = {};
+            removedNames = new Set();
+            addRecords(imagesData.images);
             processedCount = imagesData.processed_count || 0;
+            loadingMore = Boolean(imagesData.next_cursor);
+
+            // Images the OCR run couldn't read become the work list until the operator says otherwise
+            if (!reviewChosen) {
+                reviewOnly = imagesData.review_count > 0;
+                reviewOnlyInput.checked = reviewOnly;
+            }
+            filterImages();
+            watchChanges(imagesData.changes_cursor);
 
             // Update save path
             fetch('/api/config')
@@ -59,84 +99,252 @@ document.addEventListener('DOMContentLoaded', function() {
                 selectImage(0);
                 statusEl.textContent = 'Ready';
                 imageCount.textContent = `${currentIndex + 1} of ${images.length}`;
-                counterEl.textContent = `${processedCount} of ${images.length} processed`;
+                counterEl.textContent = `${processedCount} of ${allImages.length} processed`;
             } else {
-                statusEl.textContent = 'No images found';
-                currentImage.innerHTML = '<div class="text-ibm-gray-50 text-center p-8 w-full">No images found in selected directory</div>';
-                imageList.innerHTML = '<div class="p-4 text-ibm-gray-60 italic">No images found in selected directory</div>';
+                showEmptyList();
+            }
+
+            if (imagesData.next_cursor) {
+                loadRemainingImages(imagesData.next_cursor, generation);
             }
         } catch (error) {
             console.error('Error loading data:', error);
             statusEl.textContent = 'Error loading data';
-            imageList.innerHTML = '<div class="p-4 text-ibm-gray-60 italic">Error loading images</div>';
-            vinList.innerHTML = '<div class="p-4 text-ibm-gray-60 italic">Error loading VIN data</div>';
+            imageListView.showMessage('<div class="p-4 text-ibm-gray-60 italic">Error loading images</div>');
+            vinListView.showMessage('<div class="p-4 text-ibm-gray-60 italic">Error loading VIN data</div>');
         }
     }
 
-    // Render image list
-    function renderImageList() {
-        imageList.innerHTML = '';
-
-        // First sort images to show unprocessed ones first
-        const sortedImages = [...images].sort((a, b) => {
-            const aProcessed = isImageProcessed(a);
-            const bProcessed = isImageProcessed(b);
-            
-            if (aProcessed && !bProcessed) return 1;
-            if (!aProcessed && bProcessed) return -1;
-            return a.localeCompare(b);
+    // Fetch the rest of the listing a page at a time, adding each page as it arrives
+    async function loadRemainingImages(cursor, generation) {
+        try {
+            while (cursor) {
+                const response = await fetch(`/api/images?limit=${IMAGE_PAGE_SIZE}&cursor=${encodeURIComponent(cursor)}`);
+                const data = await response.json();
+                if (generation !== loadGeneration) return;  // a reload replaced the list
+
+                addRecords(data.images);
+                cursor = data.next_cursor;
+                loadingMore = Boolean(cursor);
+                refreshImageList();
+            }
+        } catch (error) {
+            console.error('Error loading images:', error);
+            loadingMore = false;
+            statusEl.textContent = 'Error loading images';
+        }
+    }
+
+    // Add a page of records, skipping names already listed or renamed or deleted since the load began
+    function addRecords(records) {
+        records.forEach(record => {
+            if (record.name in imageRecords || removedNames.has(record.name)) return;
+            imageRecords[record.name] = record;
+            allImages.push(record.name);
         });
+    }
 
-        sortedImages.forEach((image, index) => {
-            const originalIndex = images.indexOf(image);
-            const item = document.createElement('div');
-            item.className = 'py-3 px-4 border-b border-ibm-gray-30 cursor-pointer text-sm whitespace-nowrap overflow-hidden text-ellipsis transition-colors';
+    // Narrow the work list to the review queue if asked, and show how many images are on it
+    function filterImages() {
+        const queued = allImages.filter(name => imageRecords[name].review);
+        images = reviewOnly ? queued : allImages.slice();
+        reviewCountEl.textContent = queued.length;
+        reviewToggle.classList.toggle('hidden', queued.length === 0 && !reviewOnly);
+    }
 
-            if (originalIndex === currentIndex) {
-                item.classList.add('bg-ibm-blue', 'text-white');
-            }
+    // Rebuild the work list after images were added, removed or changed, keeping the selected image
+    function refreshImageList(selected = images[currentIndex]) {
+        filterImages();
+        const index = images.indexOf(selected);
+        if (index !== -1) {
+            currentIndex = index;
+            imageName.textContent = selected;
+            renderImageList();
+        } else if (images.length === 0) {
+            showEmptyList();
+        } else {
+            // The image being viewed was deleted or reviewed, or none was: show the one in its place
+            renderImageList();
+            selectImage(Math.min(currentIndex, images.length - 1));
+        }
+        if (images.length > 0) {
+            imageCount.textContent = `${currentIndex + 1} of ${images.length}`;
+        }
+        counterEl.textContent = `${processedCount} of ${allImages.length} processed`;
+    }
 
-            // Check if this image has been processed
-            if (isImageProcessed(image)) {
-                item.classList.add('text-ibm-gray-50');
-                item.innerHTML = `<span class="inline-block w-2 h-2 rounded-full bg-ibm-green mr-2"></span>${image}`;
-            } else {
-                item.innerHTML = image;
-            }
+    // Explain an empty work list: more pages to come, nothing left to review, or no images at all
+    function showEmptyList() {
+        imageName.textContent = 'No image selected';
+        imageCount.textContent = '';
+        if (loadingMore) {
+            statusEl.textContent = 'Loading images...';
+            imageListView.showMessage('<div class="p-4 text-ibm-gray-60 italic">Loading images...</div>');
+        } else if (reviewOnly) {
+            statusEl.textContent = 'Review queue is empty';
+            imageListView.showMessage('<div class="p-4 text-ibm-gray-60 italic">No images waiting for review</div>');
+            currentImage.innerHTML = '<div class="text-ibm-gray-50 text-center p-8 w-full">Every image OCR couldn\'t read has been reviewed</div>';
+        } else {
+            statusEl.textContent = 'No images found';
+            imageListView.showMessage('<div class="p-4 text-ibm-gray-60 italic">No images found in selected directory</div>');
+            currentImage.innerHTML = '<div class="text-ibm-gray-50 text-center p-8 w-full">No images found in selected directory</div>';
+        }
+    }
 
-            item.addEventListener('click', () => selectImage(originalIndex));
-            imageList.appendChild(item);
-        });
+    // Render image list; only the rows in view are drawn
+    function renderImageList() {
+        imageListView.setCount(images.length);
     }
 
-    // Render VIN list
-    function renderVinList() {
-        vinList.innerHTML = '';
-
-        // First show matched VINs
-        vinData.matched.forEach(vin => {
-            const item = document.createElement('div');
-            item.className = 'p-2 border-b border-ibm-gray-30 text-sm flex items-center bg-green-50/10';
-            item.innerHTML = `<div class="w-2 h-2 rounded-full bg-ibm-green mr-2"></div>${vin}`;
-            vinList.appendChild(item);
+    // One image row: the server sends images already sorted, unprocessed first
+    function describeImageRow(index) {
+        const image = images[index];
+        const record = imageRecords[image];
+        const selected = index === currentIndex;
+        let className = 'px-4 leading-[44px] border-b border-ibm-gray-30 cursor-pointer text-sm whitespace-nowrap overflow-hidden text-ellipsis transition-colors';
+        let dot = '';
+
+        if (selected) {
+            className += ' bg-ibm-blue text-white';
+        }
+
+        // Check if this image has been processed
+        if (isImageProcessed(image)) {
+            className += ' text-ibm-gray-50';
+            dot = 'bg-ibm-green';
+        } else if (record && record.review) {
+            dot = 'bg-ibm-yellow';
+        }
+
+        return {
+            key: `${image}|${selected}|${dot}`,
+            className,
+            html: (dot ? `<span class="inline-block w-2 h-2 rounded-full ${dot} mr-2"></span>` : '') + escapeHtml(image)
+        };
+    }
+
+    // Follow the change feed so saves and deletes from every session show up without reloading
+    function watchChanges(cursor) {
+        if (!window.EventSource) return;
+        if (changeStream) changeStream.close();
+
+        changeCursor = cursor;
+        changeStream = new EventSource('/api/changes/stream' + (cursor ? `?since=${encodeURIComponent(cursor)}` : ''));
+        changeStream.onmessage = function(e) {
+            changeCursor = e.lastEventId;
+            applyChanges([JSON.parse(e.data)]);
+        };
+
+        // Changes were dropped from the log before we saw them; start again from a full load
+        changeStream.addEventListener('reset', function() {
+            changeStream.close();
+            loadData();
         });
 
-        // Then show pending VINs
-        vinData.pending.forEach(vin => {
-            const item = document.createElement('div');
-            item.className = 'p-2 border-b border-ibm-gray-30 text-sm flex items-center bg-yellow-50/10';
-            item.innerHTML = `<div class="w-2 h-2 rounded-full bg-ibm-yellow mr-2"></div>${vin}`;
-            vinList.appendChild(item);
+        // The browser reconnects on its own unless the server refused the stream, e.g. when busy
+        changeStream.onerror = function() {
+            const stream = changeStream;
+            if (stream.readyState === EventSource.CLOSED) {
+                setTimeout(function() {
+                    if (changeStream === stream) watchChanges(changeCursor);
+                }, 5000);
+            }
+        };
+    }
+
+    // Apply changes from the feed or a save response; applying a change twice has no effect
+    function applyChanges(changes) {
+        const current = images[currentIndex];
+        let selected = current;
+        let listChanged = false;
+        let vinsChanged = false;
+
+        changes.forEach(change => {
+            if (change.type === 'renamed') {
+                const record = change.record;
+                removedNames.add(change.old);
+                if (allImages.indexOf(change.old) !== -1) {
+                    // A page loaded after the rename may already list the new name
+                    const listed = allImages.indexOf(record.name);
+                    if (listed !== -1) allImages.splice(listed, 1);
+
+                    // Renamed in place, so nobody's position in the list shifts under them
+                    allImages[allImages.indexOf(change.old)] = record.name;
+                    delete imageRecords[change.old];
+                    if (selected === change.old) selected = record.name;
+                } else if (!imageRecords[record.name] || imageRecords[record.name].version === record.version) {
+                    return;  // not in our list, or already applied
+                }
+                imageRecords[record.name] = record;
+                listChanged = true;
+            } else if (change.type === 'deleted') {
+                removedNames.add(change.name);
+                const index = allImages.indexOf(change.name);
+                if (index === -1) return;
+                allImages.splice(index, 1);
+                delete imageRecords[change.name];
+                listChanged = true;
+            } else if (change.type === 'reviewed') {
+                const record = imageRecords[change.name];
+                if (!record || !record.review) return;
+                delete record.review;
+                listChanged = true;
+            } else if (change.type === 'vin_matched') {
+                processedCount = change.processed_count;
+                const pending = vinData.pending.indexOf(change.vin);
+                if (pending === -1) return;
+                vinData.pending.splice(pending, 1);
+                vinData.matched.push(change.vin);
+                vinsChanged = true;
+
+                // Images of a VIN on the sheet count as processed once it has a processed file
+                allImages.forEach(name => {
+                    const record = imageRecords[name];
+                    if (record.vin === change.vin && !record.processed) {
+                        record.processed = true;
+                        listChanged = true;
+                    }
+                });
+            }
         });
 
-        if (vinData.matched.length === 0 && vinData.pending.length === 0) {
-            vinList.innerHTML = '<div class="p-4 text-ibm-gray-60 italic">No VIN data available</div>';
+        if (listChanged) {
+            refreshImageList(selected);
         }
+        if (vinsChanged) {
+            renderVinList();
+            updateProgress();
+        }
+        if (images.length > 0) {
+            imageCount.textContent = `${currentIndex + 1} of ${images.length}`;
+        }
+        counterEl.textContent = `${processedCount} of ${allImages.length} processed`;
+    }
+
+    // Render VIN list; only the rows in view are drawn
+    function renderVinList() {
+        const count = vinData.matched.length + vinData.pending.length;
+        if (count === 0) {
+            vinListView.showMessage('<div class="p-4 text-ibm-gray-60 italic">No VIN data available</div>');
+        } else {
+            vinListView.setCount(count);
+        }
+    }
+
+    // One VIN row: matched VINs first, then pending ones
+    function describeVinRow(index) {
+        const matched = index < vinData.matched.length;
+        const vin = matched ? vinData.matched[index] : vinData.pending[index - vinData.matched.length];
+        return {
+            key: `${vin}|${matched}`,
+            className: `p-2 border-b border-ibm-gray-30 text-sm flex items-center ${matched ? 'bg-green-50/10' : 'bg-yellow-50/10'}`,
+            html: `<div class="w-2 h-2 rounded-full ${matched ? 'bg-ibm-green' : 'bg-ibm-yellow'} mr-2"></div>${escapeHtml(vin)}`
+        };
     }
 
     // Update progress indicators
     function updateProgress() {
-        const total = vinData.vins.length || images.length;
+        const total = vinData.vins.length || allImages.length;
         const matched = vinData.matched.length || processedCount;
 
         // Update progress bar
@@ -150,56 +358,31 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Check if an image has been processed
     function isImageProcessed(filename) {
-        // Check if filename starts with "DONE_" prefix
-        if (filename.startsWith('DONE_')) {
-            return true;
-        }
-        
-        // Check if VIN is in the matched list
-        const vin = extractVinFromFilename(filename);
-        return vin && vinData.matched.includes(vin);
+        const record = imageRecords[filename];
+        return record ? record.processed : filename.startsWith('DONE_');
     }
 
-    // Try to extract VIN from filename
-    function extractVinFromFilename(filename) {
-        // Try matching our VIN format first
-        const vinMatch = filename.match(/VIN[_-]([A-Z0-9]{6})/i);
-        if (vinMatch) {
-            return vinMatch[1].toUpperCase();
-        }
-            
-        // Check for DONE_ prefix with VIN
-        const doneMatch = filename.match(/DONE_([A-Z0-9]{6})_/i);
-        if (doneMatch) {
-            return doneMatch[1].toUpperCase();
-        }
-        
-        // Try to find any 6-digit alphanumeric sequence
-        const match = filename.match(/[A-Z0-9]{6}/i);
-        return match ? match[0].toUpperCase() : null;
+    // Escape text for use in list row markup
+    function escapeHtml(text) {
+        return String(text).replace(/[&<>"']/g, c => `&#${c.charCodeAt(0)};`);
     }
 
     // Select an image
     function selectImage(index) {
         if (index < 0 || index >= images.length) return;
 
+        const previous = currentIndex;
         currentIndex = index;
         const filename = images[currentIndex];
 
-        // Update UI
-        const items = imageList.querySelectorAll('.image-list > div');
-        items.forEach(item => {
-            item.classList.remove('bg-ibm-blue', 'text-white');
-        });
-
-        if (items[currentIndex]) {
-            items[currentIndex].classList.add('bg-ibm-blue', 'text-white');
-        }
+        // Update UI; only the rows gaining and losing the selection are redrawn
+        imageListView.updateRow(previous);
+        imageListView.updateRow(currentIndex);
 
         imageName.textContent = filename;
         imageCount.textContent = `${currentIndex + 1} of ${images.length}`;
 
-        // Load image with timestamp to prevent caching
+        // Load image in the current view mode
         loadImageWithMode(filename, currentImageMode);
 
         // Clear input and message
@@ -211,21 +394,47 @@ document.addEventListener('DOMContentLoaded', function() {
         vinInput.focus();
 
         // Scroll image into view
-        if (items[currentIndex]) {
-            items[currentIndex].scrollIntoView({ behavior: 'smooth', block: 'nearest' });
-        }
+        imageListView.scrollToIndex(currentIndex);
 
         // Auto-fill VIN input if possible
-        const extractedVin = extractVinFromFilename(filename);
-        if (extractedVin) {
-            vinInput.value = extractedVin;
+        const record = imageRecords[filename];
+        if (record && record.review) {
+            // Start from OCR's best guess, selected so typing replaces it; a VIN-like run in a
+            // camera filename (IMG_20240315_...) is not worth more than what OCR read
+            const review = record.review;
+            if (review.guess) {
+                vinInput.value = review.guess;
+                vinInput.select();
+                showMessage('Filled in with the OCR guess - check it before saving');
+            } else {
+                showMessage(review.reason === 'error' ? 'OCR failed on this image' : 'OCR could not read a VIN');
+            }
+        } else if (record && record.vin) {
+            vinInput.value = record.vin;
         }
     }
 
+    // Image URL; the file version lets the browser cache it for good and changes if the file does.
+    // The server prefetches what follows for this tab alone: in the review list, the next queued images
+    function imageUrl(filename, mode) {
+        const version = imageRecords[filename] && imageRecords[filename].version;
+        return `/image/${encodeURIComponent(filename)}?mode=${mode}&size=screen` + (version ? `&v=${version}` : '') +
+            (reviewOnly ? '&review=1' : '') + `&client=${clientId}`;
+    }
+
     // Load image with selected mode
-    function loadImageWithMode(filename, mode) {
-        const timestamp = new Date().getTime();
-        currentImage.innerHTML = `<img src="/image/${encodeURIComponent(filename)}?mode=${mode}&t=${timestamp}" alt="${filename}" class="max-w-full max-h-full object-contain">`;
+    function loadImageWithMode(filename, mode, attempt = 0) {
+        currentImage.innerHTML = `<img src="${imageUrl(filename, mode)}" alt="${filename}" class="max-w-full max-h-full object-contain">`;
+
+        // The server answers 503 while it is too busy to render; retry if still on this image
+        currentImage.querySelector('img').onerror = function() {
+            if (attempt >= 3) return;
+            setTimeout(function() {
+                if (images[currentIndex] === filename && currentImageMode === mode) {
+                    loadImageWithMode(filename, mode, attempt + 1);
+                }
+            }, 1000);
+        };
     }
 
     // Change image mode
@@ -283,25 +492,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 const data = await response.json();
 
                 if (data.success) {
-                    // Remove from images array
-                    images.splice(currentIndex, 1);
-
-                    // Update UI
-                    renderImageList();
+                    // Removes it from the list and selects the next image, or the previous if this was the last
+                    applyChanges(data.changes);
                     statusEl.textContent = 'Ready';
-
-                    // Select next image or previous if this was the last
-                    if (images.length === 0) {
-                        currentImage.innerHTML = '<div class="text-ibm-gray-50 text-center p-8">No images available</div>';
-                        imageName.textContent = 'No image selected';
-                        imageCount.textContent = '';
-                    } else if (currentIndex >= images.length) {
-                        selectImage(images.length - 1);
-                    } else {
-                        selectImage(currentIndex);
-                    }
-
-                    counterEl.textContent = `${processedCount} of ${images.length} processed`;
                     showMessage('Image deleted', 'success');
                 } else {
                     statusEl.textContent = 'Error';
@@ -355,34 +548,12 @@ document.addEventListener('DOMContentLoaded', function() {
             deleteBtn.disabled = false;
 
             if (data.success) {
-                processedCount++;
-                counterEl.textContent = `${processedCount} of ${images.length} processed`;
-
-                // Update the images array with the new filename (original file has been renamed)
-                if (data.raw_file_renamed) {
-                    images[currentIndex] = data.raw_file_new_name;
-                    renderImageList();
-                }
-
-                // Update VIN lists
-                if (data.vin_updated) {
-                    // Reload VIN data
-                    const vinResponse = await fetch('/api/vins');
-                    const vinResult = await vinResponse.json();
-                    vinData = vinResult;
-                    renderVinList();
-                    updateProgress();
-                }
+                // The renamed file and the newly matched VIN, as other sessions see them on the feed
+                applyChanges(data.changes);
 
                 showMessage(`Saved as VIN-B1024-${vin}${getFileExtension(filename)}`, 'success');
                 statusEl.textContent = 'Ready';
-
-                // Go to next image
-                if (currentIndex < images.length - 1) {
-                    setTimeout(() => nextImage(), 500);
-                } else {
-                    statusEl.textContent = 'All images processed';
-                }
+                advanceAfterSave(data.raw_file_new_name || filename);
             } else if (data.duplicate) {
                 // Handle duplicate VIN
                 statusEl.textContent = 'Duplicate VIN detected';
@@ -403,6 +574,20 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Go to the next image after a save; in the review list the saved image has already dropped out
+    // and the one after it is selected
+    function advanceAfterSave(savedName) {
+        if (images.length === 0) {
+            statusEl.textContent = reviewOnly ? 'Review queue is empty' : 'All images processed';
+        } else if (images.indexOf(savedName) === -1) {
+            return;
+        } else if (currentIndex < images.length - 1) {
+            setTimeout(() => nextImage(), 500);
+        } else {
+            statusEl.textContent = 'All images processed';
+        }
+    }
+
     // Helper functions
     function showMessage(text, type) {
         messageEl.textContent = text;
@@ -422,6 +607,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Expose some functions to global scope for modals
     window.appFunctions = {
         showMessage,
+        imageUrl,
+        applyChanges,
+        advanceAfterSave,
         nextImage,
         renderImageList,
         updateProgress,
@@ -464,6 +652,18 @@ document.addEventListener('DOMContentLoaded', function() {
                 case '2':
                     changeImageMode('inverted');
                     break;
+                case '3':
+                    changeImageMode('bw');
+                    break;
+                case '4':
+                    changeImageMode('contrast');
+                    break;
+                case '5':
+                    changeImageMode('equalize');
+                    break;
+                case '6':
+                    changeImageMode('sharp');
+                    break;
             }
         }
     });
@@ -473,6 +673,21 @@ document.addEventListener('DOMContentLoaded', function() {
         this.value = this.value.toUpperCase();
     });
 
+    // Switch between the whole directory and the OCR review queue, staying on the current image if it's in both
+    reviewOnlyInput.addEventListener('change', function() {
+        const selected = images[currentIndex];
+        reviewChosen = true;
+        reviewOnly = this.checked;
+        filterImages();
+        renderImageList();
+        if (images.length === 0) {
+            showEmptyList();
+        } else {
+            selectImage(Math.max(images.indexOf(selected), 0));
+        }
+        counterEl.textContent = `${processedCount} of ${allImages.length} processed`;
+    });
+
     // Image mode buttons
     shortcutButtons.forEach(button => {
         button.addEventListener('click', function() {
@@ -13,9 +13,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Show duplicate VIN modal
     window.showDuplicateModal = function(existingFile, newFile, vin) {
         // Set modal content
-        const timestamp = new Date().getTime();
-        existingImage.innerHTML = `<img src="/processed/${encodeURIComponent(existingFile)}?t=${timestamp}" alt="${existingFile}" class="max-w-full max-h-[300px] object-contain">`;
-        newImage.innerHTML = `<img src="/image/${encodeURIComponent(newFile)}?t=${timestamp}" alt="${newFile}" class="max-w-full max-h-[300px] object-contain">`;
+        // Processed files can be replaced under the same name; the server revalidates them by ETag
+        existingImage.innerHTML = `<img src="/processed/${encodeURIComponent(existingFile)}" alt="${existingFile}" class="max-w-full max-h-[300px] object-contain">`;
+        newImage.innerHTML = `<img src="${window.appFunctions.imageUrl(newFile, 'original')}" alt="${newFile}" class="max-w-full max-h-[300px] object-contain">`;
 
         // Show modal
         duplicateModal.classList.remove('hidden');
@@ -65,11 +65,11 @@ document.addEventListener('DOMContentLoaded', function() {
                     window.appFunctions.showMessage(`Saved with choice: ${choice}`, 'success');
                     document.getElementById('status').textContent = 'Ready';
 
-                    // Update VIN data and UI
-                    await window.appFunctions.loadData();
+                    // Update the image list and VIN data
+                    window.appFunctions.applyChanges(data.changes);
 
                     // Go to next image
-                    setTimeout(() => window.appFunctions.nextImage(), 500);
+                    window.appFunctions.advanceAfterSave(data.raw_file_new_name || newFile);
                 } else {
                     window.appFunctions.showMessage(data.message, 'error');
                     document.getElementById('status').textContent = 'Error';
@@ -0,0 +1,113 @@
+// Windowed rendering for the sidebar lists: only rows in or near the viewport exist in the DOM,
+// so updating a list costs the same whether it holds ten rows or ten thousand
+class VirtualList {
+    // describeRow(index) returns {key, className, html}; a row is only rewritten when its key changes
+    constructor(container, rowHeight, describeRow, onSelect) {
+        this.container = container;
+        this.rowHeight = rowHeight;
+        this.describeRow = describeRow;
+        this.count = 0;
+        this.rows = new Map();  // index -> row element in the DOM
+        this.frame = null;
+        this.message = null;
+
+        this.container.innerHTML = '';
+        this.container.style.position = 'relative';
+        this.spacer = document.createElement('div');
+        this.container.appendChild(this.spacer);
+
+        this.container.addEventListener('scroll', () => this.schedule());
+        window.addEventListener('resize', () => this.schedule());
+        this.container.addEventListener('click', (e) => {
+            const row = e.target.closest('[data-index]');
+            if (row && onSelect) onSelect(Number(row.dataset.index));
+        });
+    }
+
+    // Set the number of rows and redraw the visible ones
+    setCount(count) {
+        if (this.message) {
+            this.message.remove();
+            this.message = null;
+        }
+        this.count = count;
+        this.spacer.style.height = `${count * this.rowHeight}px`;
+        this.render();
+    }
+
+    // Replace the rows with a placeholder message
+    showMessage(html) {
+        this.setCount(0);
+        this.message = document.createElement('div');
+        this.message.innerHTML = html;
+        this.container.appendChild(this.message);
+    }
+
+    // Redraw on the next frame, however many scroll events arrive before it
+    schedule() {
+        if (this.frame !== null) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.render();
+        });
+    }
+
+    // Materialize the rows in the viewport plus a few either side, and drop the rest
+    render() {
+        const overscan = VirtualList.OVERSCAN;
+        const first = Math.max(0, Math.floor(this.container.scrollTop / this.rowHeight) - overscan);
+        const last = Math.min(this.count, first + Math.ceil(this.container.clientHeight / this.rowHeight) + 2 * overscan);
+
+        for (const [index, row] of this.rows) {
+            if (index < first || index >= last) {
+                row.remove();
+                this.rows.delete(index);
+            }
+        }
+        for (let index = first; index < last; index++) {
+            this.drawRow(index);
+        }
+    }
+
+    // Redraw one row if it is in the DOM; rows out of view are drawn when scrolled to
+    updateRow(index) {
+        if (this.rows.has(index)) this.drawRow(index);
+    }
+
+    drawRow(index) {
+        let row = this.rows.get(index);
+        if (!row) {
+            row = document.createElement('div');
+            row.dataset.index = index;
+            row.style.position = 'absolute';
+            row.style.left = '0';
+            row.style.right = '0';
+            row.style.top = `${index * this.rowHeight}px`;
+            row.style.height = `${this.rowHeight}px`;
+            this.rows.set(index, row);
+            this.container.appendChild(row);
+        }
+
+        const description = this.describeRow(index);
+        if (row.dataset.key !== description.key) {
+            row.dataset.key = description.key;
+            row.className = description.className;
+            row.innerHTML = description.html;
+        }
+    }
+
+    // Scroll just enough to bring a row into view
+    scrollToIndex(index) {
+        const top = index * this.rowHeight;
+        const bottom = top + this.rowHeight;
+        if (top < this.container.scrollTop) {
+            this.container.scrollTop = top;
+        } else if (bottom > this.container.scrollTop + this.container.clientHeight) {
+            this.container.scrollTop = bottom - this.container.clientHeight;
+        }
+        this.render();
+    }
+}
+
+// Rows drawn beyond each edge of the viewport, so fast scrolling doesn't show gaps
+VirtualList.OVERSCAN = 10;
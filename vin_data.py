@@ -4,23 +4,56 @@ VIN data handling module for VIN GUI application
 import os
 import re
 import csv
+import json
+import time
+import hashlib
+import tempfile
+import threading
 import requests
+from functools import lru_cache
 from io import StringIO
 
+from metrics import get_metrics
+
 # Configuration
 config = {
     "raw_dir": "",
     "processed_dir": "",
-    "prefix": "VIN-B1024-"
+    "prefix": "VIN-B1024-",
+    "cache_dir": os.path.join(os.path.expanduser("~"), ".cache", "vin_gui"),
+    "cache_max_bytes": 512 * 1024 * 1024,
+    "prefetch_depth": 3,
+    "prefetch_workers": 2,
+    "render_workers": os.cpu_count() or 2,
+    "render_queue": (os.cpu_count() or 2) * 4,
+    "image_workers": os.cpu_count() or 2,
+    "profile_rate": 0.0,
+    "profile_dir": "",
+    "profile_keep": 50,
+    "review_queue": ""
 }
 
 # Google Sheets CSV URL
 CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vRdaaAAREF9TFbxxwEKkUa6QOIdeOghd_scKCMXqVzHnAVlnH7v7zkTAPN72LpCwlpTmRE-QpilAXb8/pub?gid=1256257560&single=true&output=csv"
 
+# Seconds before a cached copy of the sheet is revalidated in the background
+MANIFEST_TTL = 60
+
+# Filename patterns for extract_vin_from_filename, most specific first
+VIN_TAG_PATTERN = re.compile(r'VIN[_-]([A-Z0-9]{6})', re.IGNORECASE)
+DONE_VIN_PATTERN = re.compile(r'DONE_([A-Z0-9]{6})_', re.IGNORECASE)
+ANY_VIN_PATTERN = re.compile(r'[A-Z0-9]{6}')
+
+# Filenames whose parsed VIN is remembered
+FILENAME_CACHE_SIZE = 1 << 17
+
 # Embedded VIN data (default data if CSV download fails)
 EMBEDDED_VIN_DATA = """MD9B10XF5CA583412,MD9B10XF5CA583430,MD9B10XF6CA583431,MD9B10XF8CA583432,MD9B10XF2CA583434,MD9B10XF3CA583453"""
 
-def initialize_config(raw_dir=None, processed_dir=None, prefix=None):
+def initialize_config(raw_dir=None, processed_dir=None, prefix=None, cache_dir=None, cache_max_bytes=None,
+                      prefetch_depth=None, prefetch_workers=None, render_workers=None, render_queue=None,
+                      profile_rate=None, profile_dir=None, profile_keep=None, review_queue=None,
+                      image_workers=None):
     """Initialize or update configuration"""
     global config
     if raw_dir:
@@ -29,14 +62,303 @@ def initialize_config(raw_dir=None, processed_dir=None, prefix=None):
         config["processed_dir"] = processed_dir
     if prefix:
         config["prefix"] = prefix
+    if cache_dir:
+        config["cache_dir"] = cache_dir
+    if cache_max_bytes:
+        config["cache_max_bytes"] = cache_max_bytes
+    if prefetch_depth is not None:
+        config["prefetch_depth"] = prefetch_depth
+    if prefetch_workers:
+        config["prefetch_workers"] = prefetch_workers
+    if render_workers:
+        config["render_workers"] = render_workers
+    if render_queue:
+        config["render_queue"] = render_queue
+    if profile_rate is not None:
+        config["profile_rate"] = profile_rate
+    if profile_dir:
+        config["profile_dir"] = profile_dir
+    if profile_keep:
+        config["profile_keep"] = profile_keep
+    if review_queue:
+        config["review_queue"] = review_queue
+    if image_workers is not None:
+        config["image_workers"] = image_workers
     return config
 
 def get_config():
     """Get current configuration"""
     return config
 
+def parse_vins(csv_data):
+    """Parse the last 6 characters of each VIN from CSV content"""
+    vins = []
+    for line in csv_data.splitlines():
+        for vin in line.split(','):
+            if re.search(r'[A-Z0-9]{17}', vin, re.IGNORECASE):
+                # Extract last 6 characters
+                vins.append(vin[-6:].upper())
+            elif len(vin.strip()) == 6 and vin.strip().isalnum():
+                # It's already just the 6 characters we need
+                vins.append(vin.strip().upper())
+    return vins
+
+
+class ManifestCache:
+    """Cached copy of the VIN sheet, revalidated in the background once it is older than the TTL"""
+
+    def __init__(self, url, cache_dir, ttl=MANIFEST_TTL):
+        self.url = url
+        self.ttl = ttl
+        self.csv_path = os.path.join(cache_dir, "manifest.csv")
+        self.meta_path = os.path.join(cache_dir, "manifest.json")
+        self.text = None
+        self.vins = []
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0
+        self.refreshing = False
+        self.refresh_thread = None
+        self.version = "0"  # digest of the sheet, so worker processes holding the same copy agree
+        self.lock = threading.Lock()
+
+    def get_vins(self):
+        """Return the parsed VIN list, fetching synchronously only when no copy exists yet"""
+        with self.lock:
+            if self.text is None:
+                self._load_from_disk()
+            if self.text is None:
+                stale = True
+                start_refresh = False
+            else:
+                stale = time.time() - self.fetched_at > self.ttl
+                start_refresh = stale and not self.refreshing
+                if start_refresh:
+                    self.refreshing = True
+
+        if self.text is None:
+            self._refresh()
+            if self.text is None:
+                # Never fetched and nothing on disk: fall back to embedded data
+                return parse_vins(EMBEDDED_VIN_DATA)
+        elif start_refresh:
+            self.refresh_thread = threading.Thread(target=self._refresh, name="manifest-refresh", daemon=True)
+            self.refresh_thread.start()
+
+        return self.vins
+
+    def close(self, timeout=5):
+        """Let a background revalidation finish writing its copy to disk"""
+        thread = self.refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _load_from_disk(self):
+        """Load the last good copy persisted by a previous run"""
+        try:
+            with open(self.csv_path, encoding="utf-8") as f:
+                text = f.read()
+            meta = {}
+            if os.path.exists(self.meta_path):
+                with open(self.meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        self._set_text(text)
+        self.etag = meta.get("etag")
+        self.last_modified = meta.get("last_modified")
+        self.fetched_at = meta.get("fetched_at", 0)
+
+    def _refresh(self):
+        """Revalidate the sheet with a conditional GET"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        try:
+            with get_metrics().timer("sheet_fetch"):
+                response = requests.get(self.url, headers=headers, timeout=5)
+            get_metrics().inc("vin_sheet_fetches_total", status=str(response.status_code))
+            with self.lock:
+                if response.status_code == 304:
+                    self.fetched_at = time.time()
+                    self._save(text_changed=False)
+                elif response.status_code == 200:
+                    self._set_text(response.text)
+                    self.etag = response.headers.get("ETag")
+                    self.last_modified = response.headers.get("Last-Modified")
+                    self.fetched_at = time.time()
+                    self._save(text_changed=True)
+                else:
+                    print(f"Error refreshing CSV: HTTP {response.status_code}")
+        except Exception as e:
+            get_metrics().inc("vin_sheet_fetches_total", status="error")
+            print(f"Error refreshing CSV: {e}")
+        finally:
+            self.refreshing = False
+
+    def _set_text(self, text):
+        """Replace the cached sheet content"""
+        self.text = text
+        self.vins = parse_vins(text)
+        self.version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+    def _save(self, text_changed):
+        """Persist the current copy and validators (lock must be held)"""
+        meta = {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at
+        }
+        try:
+            os.makedirs(os.path.dirname(self.csv_path), exist_ok=True)
+            if text_changed:
+                _write_atomic(self.csv_path, self.text)
+            _write_atomic(self.meta_path, json.dumps(meta))
+        except OSError as e:
+            print(f"Error saving CSV cache: {e}")
+
+
+def _write_atomic(path, text):
+    """Write text to path via a temp file and os.replace"""
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# VIN sheet cache, created on first use
+manifest = None
+
+def get_manifest():
+    """Get the VIN sheet cache for the current configuration"""
+    global manifest
+    if manifest is None:
+        manifest = ManifestCache(CSV_URL, config["cache_dir"])
+    return manifest
+
+class ProcessedIndex:
+    """Map of VIN to processed files, rescanned only when the directory changes"""
+
+    def __init__(self, processed_dir, prefix=""):
+        self.processed_dir = processed_dir
+        self.prefix = prefix
+        self.files = {}   # filename -> VIN (or None)
+        self.by_vin = {}  # VIN -> set of filenames
+        self.version = 0
+        self.prefix_counts = {}  # prefix -> (version, count)
+        self.matched = None      # ((version, VIN list version), VINs with a processed file)
+        self.dir_mtime = None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Pick up external changes if the directory mtime moved since the last scan"""
+        try:
+            mtime = os.stat(self.processed_dir).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self.lock:
+            if mtime == self.dir_mtime:
+                return
+            self.dir_mtime = mtime
+
+            names = set()
+            if mtime is not None:
+                with get_metrics().timer("processed_scan"), os.scandir(self.processed_dir) as entries:
+                    names = {entry.name for entry in entries if entry.is_file()}
+
+            # Only new names are parsed; known ones keep their VIN
+            for filename in set(self.files) - names:
+                self._remove(filename)
+            for filename in names - set(self.files):
+                self._add(filename)
+
+    def add(self, filename):
+        """Record a file written to the processed directory (new or replaced)"""
+        with self.lock:
+            self._remove(filename)
+            self._add(filename)
+
+    def remove(self, filename):
+        """Record a file removed from the processed directory"""
+        with self.lock:
+            self._remove(filename)
+
+    def files_for(self, vin):
+        """Return processed filenames for a VIN"""
+        self.refresh()
+        with self.lock:
+            return sorted(self.by_vin.get(vin.upper(), ()))
+
+    def count_with_prefix(self, prefix):
+        """Return the number of processed files starting with prefix, recounted only after changes"""
+        self.refresh()
+        with self.lock:
+            version, count = self.prefix_counts.get(prefix, (None, 0))
+            if version != self.version:
+                count = sum(1 for f in self.files if f.lower().startswith(prefix.lower()))
+                self.prefix_counts[prefix] = (self.version, count)
+            return count
+
+    def has_vin(self, vin):
+        """Check whether a VIN has at least one processed file"""
+        self.refresh()
+        with self.lock:
+            return vin.upper() in self.by_vin
+
+    def matched_among(self, vins, vins_version):
+        """Return the VINs in vins that have a processed file, recomputed only after either changes"""
+        self.refresh()
+        with self.lock:
+            key = (self.version, vins_version)
+            if self.matched is None or self.matched[0] != key:
+                self.matched = (key, frozenset(vin for vin in vins if vin in self.by_vin))
+            return self.matched[1]
+
+    def _vin_for(self, filename):
+        """Saved files are named prefix + VIN + extension; the prefix may itself look like a VIN"""
+        if self.prefix and filename.lower().startswith(self.prefix.lower()):
+            return extract_vin_from_filename(os.path.splitext(filename[len(self.prefix):])[0])
+        return extract_vin_from_filename(filename)
+
+    def _add(self, filename):
+        vin = self._vin_for(filename)
+        self.files[filename] = vin
+        self.version += 1
+        if vin:
+            self.by_vin.setdefault(vin, set()).add(filename)
+
+    def _remove(self, filename):
+        if filename not in self.files:
+            return
+        vin = self.files.pop(filename)
+        self.version += 1
+        if vin and vin in self.by_vin:
+            self.by_vin[vin].discard(filename)
+            if not self.by_vin[vin]:
+                del self.by_vin[vin]
+
+# Processed file index, recreated if the processed directory changes
+processed_index = None
+
+def get_processed_index():
+    """Get the processed file index for the current configuration"""
+    global processed_index
+    if (processed_index is None or processed_index.processed_dir != config["processed_dir"]
+            or processed_index.prefix != config["prefix"]):
+        processed_index = ProcessedIndex(config["processed_dir"], config["prefix"])
+    return processed_index
+
 def load_csv_data():
-    """Load VIN data from CSV file or embedded data"""
+    """Load VIN data from the cached sheet, the last saved copy or embedded data"""
     result = {
         'vins': [],
         'matched': [],
@@ -44,35 +366,14 @@ def load_csv_data():
     }
 
     try:
-        # Try to download the CSV first
-        try:
-            response = requests.get(CSV_URL, timeout=5)
-            if response.status_code == 200:
-                csv_data = response.text
-            else:
-                # Fall back to embedded data
-                csv_data = EMBEDDED_VIN_DATA
-        except:
-            # Fall back to embedded data
-            csv_data = EMBEDDED_VIN_DATA
-        
-        # Parse the CSV content
-        for line in csv_data.splitlines():
-            vins = line.split(',')
-            for vin in vins:
-                if re.search(r'[A-Z0-9]{17}', vin, re.IGNORECASE):
-                    # Extract last 6 characters
-                    result['vins'].append(vin[-6:].upper())
-                elif len(vin.strip()) == 6 and vin.strip().isalnum():
-                    # It's already just the 6 characters we need
-                    result['vins'].append(vin.strip().upper())
+        manifest = get_manifest()
+        result['vins'] = list(manifest.get_vins())
 
         # Check which VINs are already processed
         if os.path.exists(config['processed_dir']):
-            processed_files = os.listdir(config['processed_dir'])
+            matched_vins = get_processed_index().matched_among(result['vins'], manifest.version)
             for vin in result['vins']:
-                # Check if any processed file contains this VIN
-                if any(vin in f for f in processed_files):
+                if vin in matched_vins:
                     result['matched'].append(vin)
                 else:
                     result['pending'].append(vin)
@@ -81,18 +382,19 @@ def load_csv_data():
 
     return result
 
+@lru_cache(maxsize=FILENAME_CACHE_SIZE)
 def extract_vin_from_filename(filename):
     """Try to extract VIN from filename"""
     # Try matching our VIN format first
-    match = re.search(r'VIN[_-]([A-Z0-9]{6})', filename, re.IGNORECASE)
+    match = VIN_TAG_PATTERN.search(filename)
     if match:
         return match.group(1).upper()
-        
+
     # Check for DONE_ prefix with VIN
-    match = re.search(r'DONE_([A-Z0-9]{6})_', filename, re.IGNORECASE)
+    match = DONE_VIN_PATTERN.search(filename)
     if match:
         return match.group(1).upper()
-    
+
     # Try to find any 6-digit alphanumeric sequence
-    match = re.search(r'[A-Z0-9]{6}', filename.upper())
-    return match.group(0) if match else None
\ No newline at end of file
+    match = ANY_VIN_PATTERN.search(filename.upper())
+    return match.group(0) if match else None
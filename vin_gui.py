@@ -8,11 +8,10 @@ import argparse
 import webbrowser
 import threading
 from flask import Flask, render_template
-import tkinter as tk
-from tkinter import filedialog
 
 from vin_data import initialize_config
-from flask_routes import setup_routes
+from flask_routes import setup_routes, shutdown_routes, end_streams
+from vin_server import serve, DEFAULT_THREADS
 
 # Configuration
 APP_NAME = "VIN Manual Entry"
@@ -27,14 +26,34 @@ def start_browser(url):
 
     threading.Timer(1.0, _open_browser).start()
 
+def is_headless():
+    """Check whether there is no display for dialogs or a browser"""
+    if sys.platform.startswith("linux"):
+        return not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return False
+
 def select_directory(title):
     """Open a directory selection dialog"""
+    # Imported here so servers without Tk can still run
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()  # Hide the main window
     directory = filedialog.askdirectory(title=title)
     root.destroy()
     return directory if directory else None
 
+def create_app():
+    """Create the Flask app with all routes for the current configuration"""
+    app = Flask(__name__, 
+                template_folder=os.path.join(os.path.dirname(__file__), "templates"),
+                static_folder=os.path.join(os.path.dirname(__file__), "static"))
+
+    # Setup routes
+    setup_routes(app)
+    return app
+
 def main():
     """Main application entry point"""
     parser = argparse.ArgumentParser(description="VIN Manual Entry - Web GUI")
@@ -44,16 +63,31 @@ def main():
     parser.add_argument("--raw-dir", default="", help="Directory containing raw images")
     parser.add_argument("--processed-dir", default="", help="Directory for processed images")
     parser.add_argument("--no-prompt", action="store_true", help="Don't prompt for directories")
+    parser.add_argument("--serve", action="store_true", help="Run the production server for several operators (headless: no dialogs or browser)")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS, help=f"Request threads per process with --serve (default: {DEFAULT_THREADS})")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes with --serve (default: 1)")
+    parser.add_argument("--cache-dir", default="", help="Directory for cached rendered images (default: ~/.cache/vin_gui)")
+    parser.add_argument("--cache-size", type=int, default=512, help="Rendered image cache budget in MB (default: 512)")
+    parser.add_argument("--prefetch", type=int, default=3, help="Images ahead to pre-render in the background, 0 to disable (default: 3)")
+    parser.add_argument("--prefetch-workers", type=int, default=2, help="Background pre-render threads (default: 2)")
+    parser.add_argument("--render-workers", type=int, default=0, help="Concurrent on-demand renders (default: CPU count)")
+    parser.add_argument("--render-queue", type=int, default=0, help="Renders queued or running before requests get 503 (default: 4 per worker)")
+    parser.add_argument("--image-workers", type=int, help="Processes that decode, render and encode images, 0 to render on request threads (default: CPU count, shared between --processes)")
+    parser.add_argument("--profile", type=float, nargs="?", const=1.0, default=0.0, help="Profile this fraction of requests with cProfile; alone, profile every request (default: only requests sent with X-Profile: 1)")
+    parser.add_argument("--profile-dir", default="", help="Directory for request profiles (default: profiles in the cache directory)")
+    parser.add_argument("--profile-keep", type=int, default=50, help="Newest request profiles to keep (default: 50)")
+    parser.add_argument("--review-queue", default="", help="Review queue written by vin_ocr.py --headless (default: one per raw directory under the cache directory)")
 
     args = parser.parse_args()
 
     print(f"Starting {APP_NAME} v{APP_VERSION}")
+    headless = args.serve or is_headless()
     
     # Prompt for directories if not provided via command line
     raw_dir = args.raw_dir
     processed_dir = args.processed_dir
     
-    if not args.no_prompt:
+    if not args.no_prompt and not headless:
         # Prompt for raw images directory if not provided
         if not raw_dir:
             print("Please select the directory containing raw images:")
@@ -92,24 +126,40 @@ def main():
     print(f"Processed images directory: {processed_dir}")
     
     # Initialize config
-    initialize_config(raw_dir, processed_dir, args.prefix)
+    initialize_config(raw_dir, processed_dir, args.prefix,
+                      cache_dir=os.path.abspath(args.cache_dir) if args.cache_dir else None,
+                      cache_max_bytes=args.cache_size * 1024 * 1024,
+                      prefetch_depth=args.prefetch,
+                      prefetch_workers=args.prefetch_workers,
+                      render_workers=args.render_workers,
+                      render_queue=args.render_queue or (args.render_workers * 4 if args.render_workers else None),
+                      profile_rate=args.profile,
+                      profile_dir=os.path.abspath(args.profile_dir) if args.profile_dir else None,
+                      profile_keep=args.profile_keep,
+                      review_queue=os.path.abspath(args.review_queue) if args.review_queue else None,
+                      image_workers=args.image_workers if args.image_workers is not None
+                      else max(1, (os.cpu_count() or 2) // max(1, args.processes if args.serve else 1)))
     
-    # Create Flask app
-    app = Flask(__name__, 
-                template_folder=os.path.join(os.path.dirname(__file__), "templates"),
-                static_folder=os.path.join(os.path.dirname(__file__), "static"))
+    if args.serve:
+        # Each worker process builds its own app, so nothing is created before forking
+        serve(create_app, args.host, args.port, threads=args.threads, processes=args.processes,
+              on_shutdown=shutdown_routes, on_stop=end_streams)
+        print("Shutting down...")
+        return
 
-    # Setup routes
-    setup_routes(app)
+    # Create Flask app
+    app = create_app()
 
     # Start browser
-    start_browser(f"http://{args.host}:{args.port}")
+    if not headless:
+        start_browser(f"http://{args.host}:{args.port}")
 
     try:
         # Start Flask server
         app.run(host=args.host, port=args.port, debug=False)
     finally:
         print("Shutting down...")
+        shutdown_routes()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
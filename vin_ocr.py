@@ -7,11 +7,13 @@ import os
 import sys
 import json
 import base64
-import tempfile
 import glob
 import shutil
 import time
 import argparse
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import requests
@@ -20,10 +22,21 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.syntax import Syntax
+from rich.table import Table
 from pyfiglet import Figlet
 from colorama import init, Fore, Style
 from loguru import logger
-from PIL import Image
+
+from ocr_store import OCRResultStore, hash_file
+from ocr_backend import OllamaClient, BackendUnavailable
+from ocr_engines import build_cascade
+from vin_data import parse_vins, get_config
+from image_processor import render_payload, MODES
+from image_pool import init_image_pool, get_image_pool, DEFAULT_IMAGE_WORKERS
+from profiling import Profiler, DEFAULT_PROFILE_KEEP
+from metrics import get_metrics, trace
+from ocr_telemetry import TelemetrySink, load_records, summarize_runs, summarize_stages, summarize_backends
+from review_queue import ReviewQueue, default_queue_path
 
 # Configuration
 OLLAMA_URL = "https://ollama.congzhoumachinery.com"
@@ -32,10 +45,32 @@ APP_NAME = "VIN OCR Processor"
 APP_VERSION = "1.0.0"
 APP_COLOR = "blue"
 
+# Shared vision model client and OCR engine cascade, created in main or on first use
+backend_client = None
+engine_cascade = None
+
+# Profiler for sampled images, set in main when --profile is given
+profiler = None
+
+# Per-image telemetry sink and the id that groups this run's records, set in main
+telemetry = None
+RUN_ID = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+
+# Image payload sent to the model
+PAYLOAD_MAX_SIDE = 1200        # longest side in pixels
+PAYLOAD_MAX_BYTES = 300 * 1024  # JPEG byte budget
+PAYLOAD_QUALITY = 85
+PAYLOAD_MIN_QUALITY = 45
+PAYLOAD_ROI = None             # (x0, y0, x1, y1) as fractions of the image, or None for the whole image
+PAYLOAD_MODE = 'original'      # image_processor view mode applied before encoding
+
 # Default directories
 RAW_IMAGES_DIR = "raw_images"
 PROCESSED_IMAGES_DIR = "processed_images"
 
+# Per-image telemetry, one JSON record per line, appended across runs
+TELEMETRY_PATH = "vin_ocr_telemetry.jsonl"
+
 # Initialize components
 init()
 logger.remove()
@@ -44,7 +79,8 @@ console = Console()
 
 def setup_file_logger(log_file):
     """Setup file handler for logging if log_file is provided."""
-    logger.add(log_file, rotation="10 MB", level="INFO")
+    # Queued and written on loguru's own thread, so image workers never wait on the log file
+    logger.add(log_file, rotation="10 MB", level="INFO", enqueue=True)
     logger.info(f"Logging to file: {log_file}")
 
 def display_banner():
@@ -55,16 +91,6 @@ def display_banner():
     console.print(f"[{APP_COLOR}]Version: {APP_VERSION}[/{APP_COLOR}]")
     console.print(f"[{APP_COLOR}]{'=' * 60}[/{APP_COLOR}]")
 
-def encode_image_to_base64(image_path):
-    """Convert an image to base64 encoding."""
-    try:
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
-    except Exception as e:
-        logger.error(f"Error converting file to base64: {e}")
-        console.print(f"[red]Error converting file to base64: {e}[/red]")
-        return None
-
 def check_directories():
     """Ensure required directories exist."""
     try:
@@ -118,42 +144,40 @@ def navigate_directories():
 
     return chosen_dir
 
-def get_vin_from_image(image_path):
-    """Extract the last 6 characters of the VIN from the vehicle part image using Granite vision model."""
+def parse_roi(value):
+    """Parse an 'x0,y0,x1,y1' region of interest given as fractions of the image size."""
+    try:
+        roi = tuple(float(v) for v in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError("ROI must be four numbers: x0,y0,x1,y1")
+    if len(roi) != 4 or not (0 <= roi[0] < roi[2] <= 1 and 0 <= roi[1] < roi[3] <= 1):
+        raise argparse.ArgumentTypeError("ROI must be x0,y0,x1,y1 with 0 <= x0 < x1 <= 1 and 0 <= y0 < y1 <= 1")
+    return roi
+
+def prepare_image_payload(image_path):
+    """Decode, crop and JPEG-encode an image in memory for the vision model.
+
+    Returns (base64 payload, bytes sent), or (None, 0) on failure.
+    """
     if not os.path.isfile(image_path):
         logger.error(f"Image file not found: {image_path}")
-        return None
-
-    # Check file size in MB
-    file_size_mb = os.path.getsize(image_path) / (1024 * 1024)
-    logger.info(f"Image size: {file_size_mb:.2f} MB")
+        return None, 0
 
-    # If image is large, resize it
-    working_image_path = image_path
-    resized = False
-
-    if file_size_mb > 3:
-        logger.info("Image is large; resizing...")
-        try:
-            with Image.open(image_path) as img:
-                img.thumbnail((1200, 1200))
-                with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp_file:
-                    tmp_path = tmp_file.name
-                    img.save(tmp_path, "JPEG", quality=85)
-                    logger.info(f"Resized image saved as temporary file: {tmp_path}")
-            resized = True
-            working_image_path = tmp_path
-        except Exception as e:
-            logger.error(f"Error resizing image: {e}")
-            # Continue with original image if resize fails
-
-    # Get base64 image
-    image_base64 = encode_image_to_base64(working_image_path)
-    if not image_base64:
-        if resized and os.path.exists(working_image_path):
-            os.remove(working_image_path)
-        return None
+    try:
+        # Quality steps down until the payload fits the byte budget
+        payload, (width, height), quality = get_image_pool().run(
+            render_payload, image_path, PAYLOAD_MAX_SIDE, PAYLOAD_ROI, PAYLOAD_MODE,
+            PAYLOAD_MAX_BYTES, PAYLOAD_QUALITY, PAYLOAD_MIN_QUALITY
+        )
+        logger.info(f"Payload: {width}x{height}, quality {quality}, {len(payload) / 1024:.1f} KB")
+        return base64.b64encode(payload).decode('ascii'), len(payload)
+    except Exception as e:
+        logger.error(f"Error preparing image payload: {e}")
+        console.print(f"[red]Error preparing image payload: {e}[/red]")
+        return None, 0
 
+def request_vin_from_model(image_base64):
+    """Send an encoded image to the vision model and return its raw text response."""
     # Create API request with refined prompt
     prompt = (
         "This image shows a vehicle part with a stamped VIN (Vehicle Identification Number). "
@@ -162,85 +186,253 @@ def get_vin_from_image(image_path):
         "For example, if the VIN is MD9310XA6EA583696, you should return ONLY: 583696"
     )
 
-    try:
-        # Prepare API request based on Ollama's multimodal API format
-        api_request = {
-            "model": OLLAMA_MODEL,
-            "prompt": prompt,
-            "images": [image_base64],
-            "stream": False
-        }
-
-        logger.debug(f"Sending request to: {OLLAMA_URL}/api/generate")
-        logger.debug(f"Using model: {OLLAMA_MODEL}")
-
-        response = requests.post(
-            f"{OLLAMA_URL}/api/generate",
-            json=api_request,
-            timeout=120
-        )
+    logger.debug(f"Sending request to: {OLLAMA_URL}/api/generate")
+    logger.debug(f"Using model: {OLLAMA_MODEL}")
 
-        if response.status_code != 200:
-            logger.error(f"API Error: {response.status_code} - {response.text}")
-            if resized and os.path.exists(working_image_path):
-                os.remove(working_image_path)
-            return None
+    # Ollama's multimodal API format, over the pooled client
+    with get_metrics().timer("network"):
+        response_json = get_backend_client().generate(prompt, images=[image_base64])
+    if response_json is None:
+        return None
 
-        # Process response
-        response_json = response.json()
-        logger.debug(f"Response received with keys: {list(response_json.keys())}")
+    # Process response
+    logger.debug(f"Response received with keys: {list(response_json.keys())}")
+
+    llm_response = response_json.get('response', '')
+    logger.debug(f"Raw response: {llm_response}")
+    return llm_response
+
+def parse_vin_response(llm_response):
+    """Extract the last 6 VIN characters from a model response."""
+    # Clean the response (remove spaces, newlines, etc.)
+    cleaned_response = llm_response.strip()
+
+    # If the cleaned response is exactly 6 alphanumeric characters, use it directly
+    if re.match(r'^[A-Z0-9]{6}$', cleaned_response, re.IGNORECASE):
+        vin_last_6 = cleaned_response
+        logger.info(f"Extracted VIN (exact match): {vin_last_6}")
+        return vin_last_6
+
+    # Otherwise, try to find a 6-character alphanumeric sequence that looks like a VIN
+    # Look specifically for patterns commonly seen in VINs (with numbers and letters mixed)
+    vin_patterns = [
+        r'([A-Z0-9]{6})\b',  # Basic 6-char pattern with word boundary
+        r'(\d{6})',          # 6 digits
+        r'(\d{3}[A-Z0-9]{3})',  # 3 digits followed by 3 alphanumerics
+        r'([A-Z0-9]{3}\d{3})'   # 3 alphanumerics followed by 3 digits
+    ]
+
+    for pattern in vin_patterns:
+        matches = re.findall(pattern, llm_response, re.IGNORECASE)
+        if matches:
+            # Take the last match as it's more likely to be what we want
+            # (avoiding matches on example text in the response)
+            vin_last_6 = matches[-1]
+            logger.info(f"Extracted VIN using pattern {pattern}: {vin_last_6}")
+            return vin_last_6
 
-        llm_response = response_json.get('response', '')
-        logger.debug(f"Raw response: {llm_response}")
+    # If we get here, no matches were found
+    logger.warning("No valid VIN found in response")
+    return None
 
-        # Clean up temporary file if used
-        if resized and os.path.exists(working_image_path):
-            os.remove(working_image_path)
-            logger.info("Temporary resized image removed.")
+def recognize_image(image_path):
+    """Run the vision model on an image and return (vin_last_6, raw_response, payload_bytes)."""
+    image_base64, payload_bytes = prepare_image_payload(image_path)
+    if not image_base64:
+        return None, None, 0
 
-        # Extract VIN from response - improved regex pattern
-        # First, check if response contains exactly 6 alphanumeric characters
-        import re
+    try:
+        llm_response = request_vin_from_model(image_base64)
+        if llm_response is None:
+            return None, None, payload_bytes
+        with get_metrics().timer("parse"):
+            vin = parse_vin_response(llm_response)
+        return vin, llm_response, payload_bytes
+
+    except BackendUnavailable:
+        raise  # stops the run; the image itself is fine
+    except Exception as e:
+        logger.error(f"Error processing image: {e}")
+        return None, None, payload_bytes
 
-        # Clean the response (remove spaces, newlines, etc.)
-        cleaned_response = llm_response.strip()
+def get_vin_from_image(image_path):
+    """Extract the last 6 characters of the VIN from the vehicle part image using Granite vision model."""
+    return recognize_image(image_path)[0]
+
+def ocr_image(image_path, store=None, resume=True):
+    """Return an OCR result dict for an image, reusing the stored result if its content was already resolved."""
+    content_hash = hash_file(image_path) if store else None
+    if store and resume:
+        stored = store.get_resolved(content_hash)
+        if stored:
+            logger.info(f"Already resolved: {os.path.basename(image_path)} -> {stored['vin']}")
+            return {
+                'vin': stored['vin'],
+                'raw_response': stored['raw_response'],
+                'backend': stored['backend'],
+                'latency': stored['latency'],
+                'content_hash': content_hash,
+                'payload_bytes': 0,
+                'guess': None,
+                'cached': True,
+                'started': time.time(),
+                'stages': {}
+            }
+
+    started = time.time()
+    start = time.perf_counter()
+    # Stage timings recorded on this thread by the image processor, backend call and parser
+    with trace() as stages:
+        if profiler:
+            result, engine_name = profiler.run(os.path.basename(image_path), get_engine_cascade().recognize, image_path)
+        else:
+            result, engine_name = get_engine_cascade().recognize(image_path)
+    return {
+        'vin': result.vin,
+        'raw_response': result.raw_response,
+        'backend': OLLAMA_MODEL if engine_name == 'vision' else engine_name,
+        'latency': time.perf_counter() - start,
+        'content_hash': content_hash,
+        'payload_bytes': result.payload_bytes,
+        'guess': result.guess,
+        'cached': False,
+        'started': started,
+        'stages': stages
+    }
+
+def save_processed_image(image_path, processed_dir, vin_last_6, manual=False):
+    """Copy an image into processed_dir under its VIN name."""
+    file_ext = os.path.splitext(image_path)[1]
+    new_filename = f"VIN_{vin_last_6}{file_ext}"
+    new_path = os.path.join(processed_dir, new_filename)
+    with get_metrics().timer("copy"):
+        shutil.copy2(image_path, new_path)
+    logger.info(f"Image saved as: {new_filename}{' (manual entry)' if manual else ''}")
+    return new_filename
+
+def commit_result(image_path, processed_dir, result, store=None, manual_vin=None, review_queue=None):
+    """Save an image under its VIN and record the result, so reruns can skip it.
+
+    Without a VIN, the image goes on review_queue if one is given.
+    """
+    vin_last_6 = manual_vin or result['vin']
+    if manual_vin:
+        outcome = 'manual'
+    elif result['vin']:
+        outcome = 'resumed' if result['cached'] else 'recognized'
+    elif review_queue:
+        outcome = 'queued'
+    else:
+        outcome = 'skipped'
+
+    with trace() as stages:
+        try:
+            if vin_last_6:
+                file_ext = os.path.splitext(image_path)[1]
+                already_saved = os.path.exists(os.path.join(processed_dir, f"VIN_{vin_last_6}{file_ext}"))
+                if not (result['cached'] and already_saved):
+                    save_processed_image(image_path, processed_dir, vin_last_6, manual=bool(manual_vin))
+                if review_queue and review_queue.remove(os.path.basename(image_path)):
+                    logger.info(f"Removed {os.path.basename(image_path)} from the review queue")
+            elif review_queue:
+                queue_for_review(review_queue, image_path, result)
+
+            if store and not result['cached']:
+                with get_metrics().timer("store"):
+                    store.record(
+                        result['content_hash'],
+                        os.path.basename(image_path),
+                        vin_last_6,
+                        result['raw_response'],
+                        'manual' if manual_vin else result['backend'],
+                        result['latency']
+                    )
+        except Exception as error:
+            record_telemetry(image_path, result, 'copy_failed', vin_last_6, stages, error)
+            raise
+    record_telemetry(image_path, result, outcome, vin_last_6, stages)
+
+def queue_for_review(review_queue, image_path, result, error=None):
+    """Put an image on the review queue with the best guess OCR had for it."""
+    filename = os.path.basename(image_path)
+    if result:
+        review_queue.add(filename, guess=result['guess'], reason='no_vin', backend=result['backend'],
+                         raw_response=result['raw_response'], run=RUN_ID)
+    else:
+        review_queue.add(filename, reason='error', raw_response=str(error), run=RUN_ID)
+    logger.info(f"Queued {filename} for review" + (f" (guess {result['guess']})" if result and result['guess'] else ""))
+
+def record_telemetry(image_path, result, outcome, vin=None, commit_stages=None, error=None):
+    """Queue one telemetry record for an image; result is None if OCR itself failed."""
+    if telemetry is None:
+        return
+    stages = dict(result['stages']) if result else {}
+    for stage, seconds in (commit_stages or {}).items():
+        stages[stage] = stages.get(stage, 0.0) + seconds
+    seconds = (result['latency'] if result and not result['cached'] else 0.0) + sum((commit_stages or {}).values())
+    now = time.time()
+    telemetry.emit({
+        'run': RUN_ID,
+        'image': os.path.basename(image_path),
+        'outcome': outcome,
+        'vin': vin or None,
+        'backend': result['backend'] if result else None,
+        'payload_bytes': result['payload_bytes'] if result else 0,
+        'seconds': seconds,
+        'stages': stages,
+        'started': result['started'] if result else now,
+        'finished': now,
+        'error': str(error) if error else None
+    })
+
+def iter_vin_results(image_files, concurrency=1, delay=1.0, store=None, resume=True):
+    """Yield (image_path, result, error) for each image, in input order.
+
+    With concurrency > 1, up to that many images are encoded and sent to the model
+    at once, while results are still yielded in the original order.
+    """
+    if concurrency <= 1:
+        for image_path in image_files:
+            try:
+                result = ocr_image(image_path, store, resume)
+            except Exception as error:
+                yield image_path, None, error
+                continue
 
-        # If the cleaned response is exactly 6 alphanumeric characters, use it directly
-        if re.match(r'^[A-Z0-9]{6}$', cleaned_response, re.IGNORECASE):
-            vin_last_6 = cleaned_response
-            logger.info(f"Extracted VIN (exact match): {vin_last_6}")
-            return vin_last_6
+            yield image_path, result, None
 
-        # Otherwise, try to find a 6-character alphanumeric sequence that looks like a VIN
-        # Look specifically for patterns commonly seen in VINs (with numbers and letters mixed)
-        vin_patterns = [
-            r'([A-Z0-9]{6})\b',  # Basic 6-char pattern with word boundary
-            r'(\d{6})',          # 6 digits
-            r'(\d{3}[A-Z0-9]{3})',  # 3 digits followed by 3 alphanumerics
-            r'([A-Z0-9]{3}\d{3})'   # 3 alphanumerics followed by 3 digits
-        ]
-
-        for pattern in vin_patterns:
-            matches = re.findall(pattern, llm_response, re.IGNORECASE)
-            if matches:
-                # Take the last match as it's more likely to be what we want
-                # (avoiding matches on example text in the response)
-                vin_last_6 = matches[-1]
-                logger.info(f"Extracted VIN using pattern {pattern}: {vin_last_6}")
-                return vin_last_6
-
-        # If we get here, no matches were found
-        logger.warning("No valid VIN found in response")
-        return None
+            # Add a small delay between requests
+            if not result['cached']:
+                time.sleep(delay)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ocr") as executor:
+        pending = deque()
+        files = iter(image_files)
+
+        # Keep at most `concurrency` requests in flight
+        for image_path in files:
+            pending.append((image_path, executor.submit(ocr_image, image_path, store, resume)))
+            if len(pending) >= concurrency:
+                break
+
+        while pending:
+            image_path, future = pending.popleft()
+            next_path = next(files, None)
+            if next_path is not None:
+                pending.append((next_path, executor.submit(ocr_image, next_path, store, resume)))
+            try:
+                yield image_path, future.result(), None
+            except Exception as error:
+                yield image_path, None, error
 
-    except Exception as e:
-        logger.error(f"Error processing image: {e}")
-        if resized and os.path.exists(working_image_path):
-            os.remove(working_image_path)
-        return None
+def process_images(raw_dir, processed_dir, start_from=1, batch_size=None, concurrency=1, delay=1.0, store=None, resume=True,
+                   review_queue=None):
+    """Process images in raw_dir for VIN OCR and save processed images with renamed VIN.
 
-def process_images(raw_dir, processed_dir, start_from=1, batch_size=None):
-    """Process images in raw_dir for VIN OCR and save processed images with renamed VIN."""
+    With a review_queue, images without a VIN are queued for the web GUI instead of
+    prompting for them, so the run never waits on input.
+    """
     image_files = sorted(
         glob.glob(os.path.join(raw_dir, '*.jpg')) +
         glob.glob(os.path.join(raw_dir, '*.jpeg')) +
@@ -266,6 +458,14 @@ def process_images(raw_dir, processed_dir, start_from=1, batch_size=None):
     processed_count = 0
     renamed_count = 0
     skipped_count = 0
+    resumed_count = 0
+    queued_count = 0
+    payload_bytes = []
+    outage = None
+
+    # File copies run on their own thread so they overlap with model calls
+    copy_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="copy")
+    copy_futures = []
 
     with Progress(
         SpinnerColumn(),
@@ -274,63 +474,202 @@ def process_images(raw_dir, processed_dir, start_from=1, batch_size=None):
     ) as progress:
         overall_task = progress.add_task(f"[green]Processing images...", total=total_to_process)
 
-        for idx, image_path in enumerate(image_files, 1):
+        results = iter_vin_results(image_files, concurrency=concurrency, delay=delay, store=store, resume=resume)
+        for idx, (image_path, result, error) in enumerate(results, 1):
             filename = os.path.basename(image_path)
             progress.update(overall_task, description=f"[cyan]Processing image {idx}/{total_to_process}: {filename}")
 
+            if isinstance(error, BackendUnavailable):
+                # Nothing is wrong with the image: stop here, and a rerun resumes from it
+                outage = error
+                break
+
             try:
-                vin_last_6 = get_vin_from_image(image_path)
-
-                if vin_last_6:
-                    file_ext = os.path.splitext(image_path)[1]
-                    new_filename = f"VIN_{vin_last_6}{file_ext}"
-                    new_path = os.path.join(processed_dir, new_filename)
-                    shutil.copy2(image_path, new_path)
-                    logger.info(f"Image saved as: {new_filename}")
-                    renamed_count += 1
+                if error:
+                    if review_queue:
+                        queue_for_review(review_queue, image_path, None, error)
+                        queued_count += 1
+                    record_telemetry(image_path, None, 'error', error=error)
+                    raise error
+
+                if result['payload_bytes']:
+                    payload_bytes.append(result['payload_bytes'])
+
+                if result['vin']:
+                    copy_futures.append((filename, False, copy_executor.submit(commit_result, image_path, processed_dir, result, store)))
+                    if result['cached']:
+                        resumed_count += 1
+                    else:
+                        renamed_count += 1
+                elif review_queue:
+                    copy_futures.append((filename, True, copy_executor.submit(commit_result, image_path, processed_dir, result, store,
+                                                                              review_queue=review_queue)))
+                    queued_count += 1
                 else:
                     progress.stop()
                     console.print(f"[yellow]Could not extract VIN from {filename}[/yellow]")
                     manual_vin = input("Enter the last 6 digits of the VIN manually (or press Enter to skip): ").strip()
                     progress.start()
 
+                    copy_futures.append((filename, False, copy_executor.submit(commit_result, image_path, processed_dir, result, store, manual_vin)))
                     if manual_vin:
-                        file_ext = os.path.splitext(image_path)[1]
-                        new_filename = f"VIN_{manual_vin}{file_ext}"
-                        new_path = os.path.join(processed_dir, new_filename)
-                        shutil.copy2(image_path, new_path)
-                        logger.info(f"Image saved as: {new_filename} (manual entry)")
                         renamed_count += 1
                     else:
                         skipped_count += 1
             except Exception as error:
                 logger.error(f"Error processing {filename}: {str(error)}")
-                skipped_count += 1
+                if not review_queue:
+                    skipped_count += 1
 
             processed_count += 1
             progress.update(overall_task, advance=1)
 
-            # Add a small delay between requests
-            time.sleep(1)
+    # Copies run in submission order, so a later image with the same VIN still wins
+    copy_executor.shutdown(wait=True)
+    for filename, queued, future in copy_futures:
+        try:
+            future.result()
+        except Exception as error:
+            logger.error(f"Error {'queuing' if queued else 'saving'} {filename}: {str(error)}")
+            if queued:
+                queued_count -= 1
+            else:
+                renamed_count -= 1
+            skipped_count += 1
 
+    if outage:
+        logger.error(f"Stopped after {processed_count} of {total_to_process} images: {outage}")
+        console.print(f"[red]Stopped after {processed_count} of {total_to_process} images: {outage}. "
+                      f"Rerun once the backend is back to continue.[/red]")
     console.print(f"[green]Summary: Processed {processed_count} images[/green]")
     console.print(f"[green]- Successfully renamed: {renamed_count}[/green]")
+    if resumed_count:
+        console.print(f"[green]- Already resolved in a previous run: {resumed_count}[/green]")
+    if queued_count:
+        console.print(f"[yellow]- Queued for review in the web GUI: {queued_count} ({review_queue.path})[/yellow]")
     console.print(f"[yellow]- Skipped: {skipped_count}[/yellow]")
+    if payload_bytes:
+        console.print(f"[green]- Sent to model: {sum(payload_bytes) / 1024:.1f} KB total, "
+                      f"{sum(payload_bytes) / len(payload_bytes) / 1024:.1f} KB per image[/green]")
+
+    return outage is None
+
+def get_backend_client():
+    """Get the shared vision model client, creating one with default settings if needed."""
+    global backend_client
+    if backend_client is None:
+        backend_client = OllamaClient(OLLAMA_URL, OLLAMA_MODEL)
+    return backend_client
+
+def get_engine_cascade():
+    """Get the OCR engine cascade, defaulting to the vision model alone."""
+    global engine_cascade
+    if engine_cascade is None:
+        engine_cascade = build_cascade(['vision'], recognize_image)
+    return engine_cascade
+
+def print_engine_stats(cascade):
+    """Print per-engine usage, acceptance, accuracy and latency for the run."""
+    for name, stats in cascade.report().items():
+        if not stats['used']:
+            continue
+        accuracy = f"{stats['accuracy']:.0%}" if stats['accuracy'] is not None else "n/a"
+        console.print(f"[green]Engine {name}: used {stats['used']}, accepted {stats['accepted']}, "
+                      f"accuracy {accuracy}, mean {stats['mean_seconds']:.2f}s, p95 {stats['p95_seconds']:.2f}s[/green]")
+
+def print_backend_stats(client):
+    """Print per-call backend timings for the run."""
+    stats = client.stats()
+    if not stats['calls'] and not stats['failed_calls']:
+        return
+    console.print(f"[green]Backend: {stats['calls']} calls, {stats['failed_calls']} failed, "
+                  f"{stats['new_connections']} new connections, {stats['retries']} retries, "
+                  f"{stats['circuit_opens']} pauses[/green]")
+    for key, label in (('round_trip', 'Round trip'), ('inference', 'Inference'),
+                       ('load', 'Model load'), ('overhead', 'Network/queue')):
+        if key in stats:
+            console.print(f"[green]- {label}: p50 {stats[key]['p50']:.2f}s, p95 {stats[key]['p95']:.2f}s[/green]")
+
+def format_seconds(value):
+    """Format a duration for the report tables."""
+    if value is None:
+        return "-"
+    if value < 0.01:
+        return f"{value * 1000:.1f}ms"
+    return f"{value * 1000:.0f}ms" if value < 1 else f"{value:.2f}s"
+
+def format_rate(value):
+    """Format a fraction as a percentage for the report tables."""
+    return "-" if value is None else f"{value:.0%}"
+
+def run_report(argv):
+    """Print throughput, tail latency and success tables from the telemetry of previous runs."""
+    parser = argparse.ArgumentParser(prog="vin_ocr.py report", description="Summarize VIN OCR telemetry")
+    parser.add_argument("--telemetry", default=TELEMETRY_PATH, help=f"Telemetry file to read (default: {TELEMETRY_PATH})")
+    parser.add_argument("--runs", type=int, default=10, help="Summarize only the most recent N runs, 0 for all (default: 10)")
+    parser.add_argument("--run", help="Summarize only this run id")
+    args = parser.parse_args(argv)
+
+    try:
+        records = load_records(args.telemetry)
+    except OSError as e:
+        console.print(f"[red]Could not read telemetry: {e}[/red]")
+        sys.exit(1)
 
-    return True
+    runs = summarize_runs(records)
+    if args.run:
+        runs = [run for run in runs if run['run'] == args.run]
+    elif args.runs > 0:
+        runs = runs[-args.runs:]
+    selected = {run['run'] for run in runs}
+    records = [record for record in records if record.get('run') in selected]
+    if not records:
+        console.print("[yellow]No telemetry recorded for the selected runs[/yellow]")
+        return
+
+    table = Table(title="Runs")
+    for column in ("Run", "Images", "Wall", "Img/min", "Success", "Payload", "Outcomes"):
+        table.add_column(column, justify="left" if column in ("Run", "Outcomes") else "right")
+    for run in runs:
+        per_minute = run['images_per_minute']
+        payload = run['mean_payload_bytes']
+        table.add_row(
+            str(run['run']),
+            str(run['images']),
+            format_seconds(run['wall_seconds']),
+            f"{per_minute:.1f}" if per_minute else "-",
+            format_rate(run['success_rate']),
+            f"{payload / 1024:.1f} KB" if payload else "-",
+            ", ".join(f"{outcome} {count}" for outcome, count in sorted(run['outcomes'].items()))
+        )
+    console.print(table)
+
+    table = Table(title="Stage latency (images that ran OCR)")
+    for column in ("Stage", "Count", "Mean", "p50", "p95", "p99", "Max"):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+    for stage in summarize_stages(records):
+        table.add_row(stage['stage'], str(stage['count']),
+                      *(format_seconds(stage[key]) for key in ("mean", "p50", "p95", "p99", "max")))
+    console.print(table)
+
+    table = Table(title="Backends")
+    for column in ("Backend", "Images", "Recognized", "p50", "p95"):
+        table.add_column(column, justify="left" if column == "Backend" else "right")
+    for backend in summarize_backends(records):
+        table.add_row(backend['backend'], str(backend['images']), format_rate(backend['success_rate']),
+                      format_seconds(backend['p50']), format_seconds(backend['p95']))
+    console.print(table)
 
 def check_api_connectivity():
     """Check if Ollama API is available."""
+    client = get_backend_client()
     try:
-        version_response = requests.get(f"{OLLAMA_URL}/api/version", timeout=5)
-        version_info = version_response.json()
+        version = client.version()
         console.print(f"[green]✓ Connected to Ollama API at {OLLAMA_URL}[/green]")
-        console.print(f"[green]✓ Ollama version: {version_info.get('version', 'unknown')}[/green]")
+        console.print(f"[green]✓ Ollama version: {version}[/green]")
 
         # Check if the model is available
-        models_response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
-        models = models_response.json().get('models', [])
-        model_names = [m.get('name') for m in models]
+        model_names = client.list_models()
 
         if OLLAMA_MODEL.split(':')[0] in model_names or OLLAMA_MODEL in model_names:
             console.print(f"[green]✓ Model {OLLAMA_MODEL} is available[/green]")
@@ -347,6 +686,11 @@ def check_api_connectivity():
 
 def main():
     """Main application entry point."""
+    global PAYLOAD_MAX_SIDE, PAYLOAD_MAX_BYTES, PAYLOAD_ROI, PAYLOAD_MODE, backend_client, engine_cascade, profiler, telemetry
+    if len(sys.argv) > 1 and sys.argv[1] == "report":
+        run_report(sys.argv[2:])
+        return
+
     try:
         display_banner()
         console.print("[yellow]Extracting VIN numbers from vehicle part images using Granite Vision[/yellow]")
@@ -359,6 +703,29 @@ def main():
         parser.add_argument("--log", default="vin_ocr_log.txt", help="Log file path")
         parser.add_argument("--start-from", type=int, default=1, help="Start processing from image #N")
         parser.add_argument("--batch", type=int, help="Process only this many images")
+        parser.add_argument("--concurrency", type=int, default=1, help="Number of images in flight to the model at once (default: 1)")
+        parser.add_argument("--max-side", type=int, default=PAYLOAD_MAX_SIDE, help=f"Longest side of the image sent to the model (default: {PAYLOAD_MAX_SIDE})")
+        parser.add_argument("--max-kb", type=int, default=PAYLOAD_MAX_BYTES // 1024, help=f"JPEG size budget per image in KB (default: {PAYLOAD_MAX_BYTES // 1024})")
+        parser.add_argument("--roi", type=parse_roi, help="Crop to this region before sending, as fractions x0,y0,x1,y1 (e.g. 0.1,0.3,0.9,0.7)")
+        parser.add_argument("--image-mode", choices=MODES, default=PAYLOAD_MODE, help=f"Preprocess images with this view mode before sending (default: {PAYLOAD_MODE})")
+        parser.add_argument("--results-db", default="vin_ocr_results.db", help="SQLite database of OCR results, used to skip already resolved images")
+        parser.add_argument("--no-resume", action="store_true", help="Re-run OCR on images already resolved in the results database")
+        parser.add_argument("--engines", default="tesseract,vision", help="Comma-separated OCR engines to try in order, cheapest first (default: tesseract,vision)")
+        parser.add_argument("--min-confidence", type=float, default=0.8, help="Confidence an engine needs before its result is accepted without escalating (default: 0.8)")
+        parser.add_argument("--vin-list", help="CSV of expected VINs; results must match one to be accepted without escalating")
+        parser.add_argument("--keep-alive", default="30m", help="How long the model stays loaded between calls, in Ollama duration format (default: 30m)")
+        parser.add_argument("--retries", type=int, default=3, help="Retries per image on server errors and timeouts (default: 3)")
+        parser.add_argument("--cooldown", type=int, default=60, help="Seconds to pause after repeated backend failures (default: 60)")
+        parser.add_argument("--max-outage", type=int, default=1800, help="Seconds to keep pausing for a failing backend before stopping the run, 0 to wait indefinitely (default: 1800)")
+        parser.add_argument("--delay", type=float, default=1.0, help="Delay in seconds between requests when --concurrency is 1 (default: 1.0)")
+        parser.add_argument("--profile", type=float, nargs="?", const=1.0, default=0.0, help="Profile OCR on this fraction of images with cProfile; alone, profile every image")
+        parser.add_argument("--telemetry", default=TELEMETRY_PATH, help=f"JSONL file for per-image stage timings and outcomes, read by the report command; empty to disable (default: {TELEMETRY_PATH})")
+        parser.add_argument("--profile-dir", default="vin_ocr_profiles", help="Directory for OCR profiles (default: vin_ocr_profiles)")
+        parser.add_argument("--profile-keep", type=int, default=DEFAULT_PROFILE_KEEP, help=f"Newest OCR profiles to keep (default: {DEFAULT_PROFILE_KEEP})")
+        parser.add_argument("--image-workers", type=int, default=DEFAULT_IMAGE_WORKERS, help=f"Processes that decode, crop and encode images, 0 to do it on the OCR threads (default: {DEFAULT_IMAGE_WORKERS})")
+        parser.add_argument("--headless", action="store_true", help="Never prompt: queue images without a VIN for review in the web GUI and keep going")
+        parser.add_argument("--review-queue", help="Review queue file for --headless (default: the one the web GUI reads for the raw image directory)")
+        parser.add_argument("--cache-dir", default=get_config()["cache_dir"], help=f"Web GUI cache directory holding the default review queue; match vin_gui.py --cache-dir (default: {get_config()['cache_dir']})")
 
         args = parser.parse_args()
 
@@ -370,30 +737,92 @@ def main():
         global RAW_IMAGES_DIR, PROCESSED_IMAGES_DIR
         RAW_IMAGES_DIR = args.raw_dir if args.raw_dir else RAW_IMAGES_DIR
         PROCESSED_IMAGES_DIR = args.processed_dir if args.processed_dir else PROCESSED_IMAGES_DIR
+        PAYLOAD_MAX_SIDE = args.max_side
+        PAYLOAD_MAX_BYTES = args.max_kb * 1024
+        PAYLOAD_ROI = args.roi
+        PAYLOAD_MODE = args.image_mode
+        init_image_pool(args.image_workers)
+        if args.profile > 0:
+            profiler = Profiler(args.profile_dir, args.profile, args.profile_keep)
+            logger.info(f"Profiling {args.profile:.0%} of images into {args.profile_dir}")
+        backend_client = OllamaClient(
+            OLLAMA_URL,
+            OLLAMA_MODEL,
+            keep_alive=args.keep_alive,
+            max_retries=args.retries,
+            pool_size=max(args.concurrency, 1),
+            cooldown=args.cooldown,
+            max_outage=args.max_outage
+        )
+
+        known_vins = None
+        if args.vin_list:
+            with open(args.vin_list, encoding="utf-8") as f:
+                known_vins = parse_vins(f.read())
+            logger.info(f"Loaded {len(known_vins)} expected VINs from {args.vin_list}")
+        engine_cascade = build_cascade(
+            [name.strip() for name in args.engines.split(',') if name.strip()],
+            recognize_image,
+            min_confidence=args.min_confidence,
+            known_vins=known_vins
+        )
+        uses_vision = any(engine.name == 'vision' for engine in engine_cascade.engines)
 
         if not check_directories():
             console.print("[red]Failed to create required directories[/red]")
             return
 
         # Check API connectivity
-        if not check_api_connectivity():
+        if uses_vision and not check_api_connectivity():
             console.print("[red]API connectivity issues detected[/red]")
             return
 
+        # Load the model up front so the first image doesn't pay for it
+        if uses_vision:
+            try:
+                load_seconds = backend_client.warm_up()
+                console.print(f"[green]✓ Model loaded and kept resident for {args.keep_alive} ({load_seconds:.1f}s)[/green]")
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Model warm-up failed: {e}")
+
         # If raw_dir wasn't specified, ask user to select a directory
-        if not args.raw_dir:
+        if not args.raw_dir and not args.headless:
             console.print()
             console.print("[bold]Navigate and select a directory containing vehicle part images[/bold]")
             RAW_IMAGES_DIR = navigate_directories()
             console.print(f"[green]Selected directory: {RAW_IMAGES_DIR}[/green]")
 
+        # Results are keyed by content hash, so reruns resume wherever the last run stopped
+        store = OCRResultStore(args.results_db)
+        if args.telemetry:
+            telemetry = TelemetrySink(args.telemetry)
+            logger.info(f"Run {RUN_ID}: recording per-image telemetry to {args.telemetry}")
+        review_queue = None
+        if args.headless:
+            review_queue = ReviewQueue(args.review_queue or default_queue_path(RAW_IMAGES_DIR, args.cache_dir))
+            logger.info(f"Images without a VIN go to the review queue {review_queue.path}")
+
         # Process images
-        success = process_images(
-            raw_dir=RAW_IMAGES_DIR,
-            processed_dir=PROCESSED_IMAGES_DIR,
-            start_from=args.start_from,
-            batch_size=args.batch
-        )
+        try:
+            success = process_images(
+                raw_dir=RAW_IMAGES_DIR,
+                processed_dir=PROCESSED_IMAGES_DIR,
+                start_from=args.start_from,
+                batch_size=args.batch,
+                concurrency=args.concurrency,
+                delay=args.delay,
+                store=store,
+                resume=not args.no_resume,
+                review_queue=review_queue
+            )
+        finally:
+            store.close()
+            get_image_pool().close()
+            if telemetry:
+                telemetry.close()
+            print_engine_stats(engine_cascade)
+            print_backend_stats(backend_client)
+            backend_client.close()
 
         if success:
             console.print()
@@ -0,0 +1,173 @@
+"""
+Production server for VIN GUI application
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, select_address_family, get_sockaddr
+
+# Request threads per worker process
+DEFAULT_THREADS = 16
+
+# Seconds an idle keep-alive connection is held open; also bounds how long shutdown waits for it
+KEEP_ALIVE_TIMEOUT = 5
+
+# Seconds to wait before replacing a worker process that exited unexpectedly
+RESPAWN_DELAY = 1
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    """HTTP/1.1 keep-alive request handler that drops idle connections"""
+
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server that handles connections on a fixed-size thread pool"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads=DEFAULT_THREADS, fd=None, multiprocess=False):
+        self.multiprocess = multiprocess
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+        super().__init__(host, port, app, handler=PooledRequestHandler, fd=fd)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self):
+        """Wait for requests already accepted to finish"""
+        self.pool.shutdown(wait=True)
+
+
+def bind_socket(host, port):
+    """Bind a listening socket that worker processes can share"""
+    family = select_address_family(host, port)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(get_sockaddr(host, int(port), family))
+    sock.listen(128)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_worker(create_app, host, port, sock, threads, multiprocess=False, on_shutdown=None, on_stop=None):
+    """Serve create_app() on an already bound socket until SIGTERM or SIGINT, then shut down cleanly
+
+    on_stop runs as soon as shutdown begins, to end long-lived responses;
+    on_shutdown runs once in-flight requests have finished.
+    """
+    app = create_app()
+    server = PooledWSGIServer(host, port, app, threads, fd=sock.fileno(), multiprocess=multiprocess)
+    stopping = threading.Event()
+
+    def _stop(signum, frame):
+        if not stopping.is_set():
+            stopping.set()
+            if on_stop:
+                on_stop()
+            # shutdown() waits for serve_forever to return, so it can't run on the serving thread
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    try:
+        server.serve_forever()
+    finally:
+        # Stop accepting, let in-flight requests finish, then flush application state
+        server.drain()
+        if on_shutdown:
+            on_shutdown()
+
+
+def serve(create_app, host, port, threads=DEFAULT_THREADS, processes=1, on_shutdown=None, on_stop=None):
+    """Serve the app with a thread pool per process and optional pre-forked worker processes
+
+    Each worker process calls create_app() after forking, so no threads or
+    open handles are shared between workers. The parent restarts workers that
+    exit unexpectedly and forwards SIGTERM/SIGINT to all of them.
+    """
+    if processes > 1 and not hasattr(os, "fork"):
+        print("Multiple worker processes need fork(); serving from a single process")
+        processes = 1
+
+    sock = bind_socket(host, port)
+    print(f"Serving on http://{host}:{port} with {processes} worker process(es) of {threads} threads")
+    if processes == 1:
+        try:
+            serve_worker(create_app, host, port, sock, threads, on_shutdown=on_shutdown, on_stop=on_stop)
+        finally:
+            sock.close()
+        return
+
+    children = set()
+    stopping = False
+
+    def _spawn():
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Held back across fork() so a child can't run the supervisor's _stop and kill its siblings
+        stop_signals = {signal.SIGTERM, signal.SIGINT}
+        signal.pthread_sigmask(signal.SIG_BLOCK, stop_signals)
+        pid = os.fork()
+        if pid == 0:
+            for signum in stop_signals:
+                signal.signal(signum, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+            status = 0
+            try:
+                serve_worker(create_app, host, port, sock, threads, multiprocess=True,
+                             on_shutdown=on_shutdown, on_stop=on_stop)
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        children.add(pid)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(processes):
+        _spawn()
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            children.discard(pid)
+            if not stopping:
+                print(f"Worker {pid} exited with status {status}; starting a replacement")
+                time.sleep(RESPAWN_DELAY)
+                if not stopping:
+                    _spawn()
+    finally:
+        sock.close()